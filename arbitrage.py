@@ -0,0 +1,136 @@
+from typing import Dict, Hashable, List, Tuple
+import hashlib
+import threading
+
+def flatten_markets(match: dict, prefix: str = '') -> Dict[str, list]:
+    """
+    Description
+    -----------
+    Flattens the markets of a match into a dictionary of dotted market paths and their odds,
+    skipping the fields which compare_markets doesn't compare either
+
+    Returns
+    --------
+    - Dict[str, list]: the odds of every market of the match by market path
+    """
+    markets = {}
+    for k, v in match.items():
+        if isinstance(v, list):
+            if k != "teams" and k != "HT-FT" and len(v) > 1 and all(isinstance(odd, (int, float)) and odd > 1 for odd in v):
+                markets[prefix + k] = v
+        elif isinstance(v, dict) and k != "Correct Score":
+            markets.update(flatten_markets(v, prefix + k + '.'))
+    return markets
+
+class BestPriceBoard:
+    """
+    Description
+    --------------
+    BestPriceBoard collects the odds of every bookmaker for the fixtures matched by a ValueBetFinder, from the
+    documents it already read, and reduces them per market to a best-price vector to find arbitrages (Σ 1/best < 1).
+    Fixtures are keyed by their pinnacle match, so each added bookmaker only costs one pass over its own odds.
+    The odds of a bookmaker are dropped as soon as a cycle doesn't add them again, unless one of the (pair, date) keys
+    they were added under was kept in that cycle, i.e. skipped on purpose by the scheduler
+
+    Methods
+    -------------
+    - begin_cycle()
+        Starts a cycle, the odds which aren't added or kept in it are dropped by the next scan
+    - keep(key)
+        Keeps the odds added under a (pair, date) key which isn't re-evaluated in this cycle
+    - add(pinnacle_match, bookmaker_match, key)
+        Adds the odds of both matches of a matched pair to the board under a (pair, date) key
+    - scan() -> List[dict]
+        Returns one document per fixture with at least one arbitrage
+    """
+
+    def __init__(self):
+
+        self._cycle = 0
+        self._kept_keys = set()
+        self._fixtures = {}
+        self._lock = threading.Lock()
+
+    def begin_cycle(self):
+        with self._lock:
+            self._cycle += 1
+            self._kept_keys = set()
+
+    def keep(self, key: Hashable):
+        with self._lock:
+            self._kept_keys.add(key)
+
+    def add(self, pinnacle_match: dict, bookmaker_match: dict, key: Hashable):
+        pinnacle_markets = flatten_markets(pinnacle_match)
+        bookmaker_markets = flatten_markets(bookmaker_match)
+        with self._lock:
+            fixture = self._fixtures.setdefault(pinnacle_match["_id"], {"books": {}})
+            fixture["info"] = {k: pinnacle_match[k] for k in ("teams", "sport_name", "country", "competition", "date", "time", "is_live")}
+            for match, markets in ((pinnacle_match, pinnacle_markets), (bookmaker_match, bookmaker_markets)):
+                previous = fixture["books"].get(match["bookmaker_name"])
+                keys = previous[3] if previous else set()
+                keys.add(key)
+                fixture["books"][match["bookmaker_name"]] = (self._cycle, match["_id"], markets, keys)
+
+    def scan(self) -> List[dict]:
+        arbitrage_documents = []
+
+        with self._lock:
+            for fixture_id in list(self._fixtures):
+                fixture = self._fixtures[fixture_id]
+                fixture["books"] = {book: entry for book, entry in fixture["books"].items() if entry[0] == self._cycle or entry[3] & self._kept_keys}
+                if len(fixture["books"]) < 2:
+                    del self._fixtures[fixture_id]
+                    continue
+                arbitrages = self._find_arbitrages(fixture)
+                if arbitrages:
+                    arbitrage_documents.append(self._arbitrage_document(fixture_id, fixture, arbitrages))
+
+        return arbitrage_documents
+
+    def _find_arbitrages(self, fixture: dict) -> List[dict]:
+        best_prices: Dict[str, Tuple[list, list]] = {}
+
+        # reduce every bookmaker's odds into the best-price vector of each market, one pass per bookmaker
+        for book, (_, _, markets, _) in fixture["books"].items():
+            for path, odds in markets.items():
+                if path not in best_prices:
+                    best_prices[path] = (list(odds), [book]*len(odds))
+                    continue
+                best_odds, best_books = best_prices[path]
+                if len(best_odds) != len(odds):
+                    continue
+                for i, odd in enumerate(odds):
+                    if odd > best_odds[i]:
+                        best_odds[i] = odd
+                        best_books[i] = book
+
+        arbitrages = []
+        for path, (best_odds, best_books) in best_prices.items():
+            implied_probability = sum(1/odd for odd in best_odds)
+            if implied_probability < 1 and len(set(best_books)) > 1:
+                arbitrages.append({
+                    "market": path,
+                    "odds": best_odds,
+                    "bookmakers": best_books,
+                    "stakes": [(1/odd)/implied_probability for odd in best_odds],
+                    "ROI": str((1/implied_probability - 1)*100)+'%'
+                })
+        return arbitrages
+
+    def _arbitrage_document(self, fixture_id: str, fixture: dict, arbitrages: List[dict]) -> dict:
+        info = fixture["info"]
+        books = sorted(fixture["books"])
+        return {
+            "_id": hashlib.md5((fixture_id + "arbitrage").encode()).hexdigest(),
+            "bookmaker_name": " - ".join(books),
+            "match_id": " - ".join(fixture["books"][book][1] for book in books),
+            "teams": str(info["teams"]),
+            "sport_name": info["sport_name"],
+            "country": info["country"],
+            "competition": info["competition"],
+            "date": info["date"],
+            "time": info["time"],
+            "is_live": info["is_live"],
+            "arbitrages": arbitrages
+        }
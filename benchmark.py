@@ -0,0 +1,60 @@
+"""
+Benchmarks the per-pair cost of compare_match_pair on synthetic matches, with and without the dense markets
+(Correct Score, HT-FT), and fails if the dense markets add more than MAX_DENSE_MARKET_OVERHEAD to it
+
+usage: python benchmark.py [iterations]
+"""
+import random
+import sys
+import timeit
+from helper_functions import compare_match_pair
+
+MAX_DENSE_MARKET_OVERHEAD = 0.25
+
+def synthetic_market(outcomes: int, margin: float, rng: random.Random) -> list:
+    probabilities = [rng.random() + 0.05 for _ in range(outcomes)]
+    total = sum(probabilities)
+    return [round(1/((p/total)*(1 + margin)), 2) for p in probabilities]
+
+def synthetic_match(_id: str, bookmaker: str, margin: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    scores = [f"{home}:{away}" for home in range(5) for away in range(5)]
+    scoreboard = lambda: {
+        "1X2": synthetic_market(3, margin, rng),
+        "Double Chance": synthetic_market(3, margin, rng),
+        "Total": {str(line + 0.5): synthetic_market(2, margin, rng) for line in range(6)},
+        "Handicap": {str(line): synthetic_market(2, margin, rng) for line in range(-3, 4)},
+        "Both Teams To Score": synthetic_market(2, margin, rng),
+        "Correct Score": dict(zip(scores, synthetic_market(len(scores), margin, rng))),
+        "HT-FT": synthetic_market(9, margin, rng),
+    }
+    return {
+        "_id": _id,
+        "bookmaker_name": bookmaker,
+        "teams": ["Home", "Away"],
+        "sport_name": "football",
+        "country": "England",
+        "competition": "Premier League",
+        "date": "01/01/30",
+        "time": "15:00",
+        "is_live": False,
+        "last_modified_date": "01/01/30",
+        "last_modified_time": "12:00:00",
+        "scoreboards": {"full_time": scoreboard(), "first_half": scoreboard(), "second_half": scoreboard()},
+    }
+
+def main(iterations: int = 2000) -> int:
+    match1 = synthetic_match("1", "pinnacle", 0.02, 1)
+    match2 = synthetic_match("2", "xbet", 0.06, 2)
+
+    without_dense = min(timeit.repeat(lambda: compare_match_pair(match1, match2, include_dense_markets=False), number=iterations, repeat=5)) / iterations
+    with_dense = min(timeit.repeat(lambda: compare_match_pair(match1, match2), number=iterations, repeat=5)) / iterations
+    overhead = with_dense/without_dense - 1
+
+    print(f"per pair without dense markets: {without_dense*1e6:.1f}us")
+    print(f"per pair with dense markets:    {with_dense*1e6:.1f}us")
+    print(f"dense market overhead:          {overhead*100:.1f}% (max {MAX_DENSE_MARKET_OVERHEAD*100:.0f}%)")
+    return 0 if overhead <= MAX_DENSE_MARKET_OVERHEAD else 1
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(arg) for arg in sys.argv[1:]]))
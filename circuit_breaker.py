@@ -0,0 +1,108 @@
+from typing import List
+import threading
+import time
+
+class TaskDeadlineExceeded(Exception):
+    """Raised when a (date, competition) task of a ValueBetFinder runs past its deadline"""
+
+class CircuitBreaker:
+    """
+    Description
+    --------------
+    CircuitBreaker stops the reads of a misbehaving collection. After failure_threshold consecutive failures the
+    breaker trips (opens) and the collection is skipped for reset_timeout seconds, after which a single trial read
+    is allowed (half open): its success closes the breaker and its failure trips it again. A trial which doesn't
+    read the collection is retried after another reset_timeout
+
+    Parameters
+    ------------
+    - failure_threshold: int
+        The number of consecutive failures which trips the breaker
+    - reset_timeout: float
+        The time in seconds a tripped breaker skips the collection before a trial read
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60):
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state != self.CLOSED and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.opened_at = time.monotonic()
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> bool:
+        """records a failure and returns True if it tripped the breaker"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+class CircuitBreakers:
+    """
+    Description
+    --------------
+    CircuitBreakers keeps one CircuitBreaker per collection name, created on first use
+
+    Parameters
+    ------------
+    - failure_threshold: int
+        The number of consecutive failures which trips a breaker
+    - reset_timeout: float
+        The time in seconds a tripped breaker skips its collection before a trial read
+
+    Methods
+    -------------
+    - allow(name) -> bool
+        Returns False while the breaker of the collection is tripped
+    - record_success(name) / record_failure(name) -> bool
+        Record the outcome of a read of the collection, record_failure returns True if it tripped the breaker
+    - tripped() -> List[str]
+        Returns the names of the collections whose breaker is tripped
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60):
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[name]
+
+    def allow(self, name: str) -> bool:
+        return self.breaker(name).allow()
+
+    def record_success(self, name: str):
+        self.breaker(name).record_success()
+
+    def record_failure(self, name: str) -> bool:
+        return self.breaker(name).record_failure()
+
+    def tripped(self) -> List[str]:
+        with self._lock:
+            return [name for name, breaker in self._breakers.items() if breaker.state != CircuitBreaker.CLOSED]
@@ -0,0 +1,176 @@
+from typing import Dict, List, Optional, Tuple
+import re
+import sys
+import threading
+
+# many-outcome markets which are compared as dense, label-aligned arrays instead of by recursive dict processing
+DENSE_MARKETS = ("Correct Score", "HT-FT")
+
+# (maximum fair odds, minimum ROI) bands in which an outcome of a dense market is a value bet,
+# the first two bands are the ones compare_market uses, the last one covers the longer odds of these markets
+DENSE_MARKET_ROI_BANDS = [(2.1, 0.01), (2.5, 0.04), (10, 0.08)]
+
+class LabelTable:
+    """
+    Description
+    --------------
+    LabelTable interns outcome labels, so that the outcomes of a dense market are aligned across
+    bookmakers by comparing integer ids instead of strings
+
+    Methods
+    -------------
+    - id(label) -> int
+        Returns the id of a label, normalizing its separators ("1-0", "1 : 0" and "1:0" share an id)
+    - label(id) -> str
+        Returns the normalized label of an id
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._raw_ids = {}
+        self._labels = []
+        self._lock = threading.Lock()
+
+    def id(self, label) -> int:
+        label_id = self._raw_ids.get(label)
+        if label_id is None:
+            normalized_label = sys.intern(re.sub(r'\s*[-:/]\s*', ':', str(label).strip().upper()))
+            with self._lock:
+                label_id = self._ids.setdefault(normalized_label, len(self._labels))
+                if label_id == len(self._labels):
+                    self._labels.append(normalized_label)
+                self._raw_ids[label] = label_id
+        return label_id
+
+    def label(self, label_id: int) -> str:
+        return self._labels[label_id]
+
+outcome_labels = LabelTable()
+
+def dense_market(market) -> Optional[Tuple[List[int], List[float], bool]]:
+    """
+    Description
+    -----------
+    Converts a dense market to outcome label ids and odds. A market can be a dict of labels and odds,
+    a list of [label, odds] pairs or a plain list of odds, in which case its outcomes are positional
+
+    Returns
+    --------
+    - Tuple[List[int], List[float], bool]: the label ids, the odds and whether the outcomes are positional,
+      None if the market can't be read
+    """
+    try:
+        if isinstance(market, dict):
+            return [outcome_labels.id(label) for label in market], [float(odd) for odd in market.values()], False
+        if isinstance(market, list) and market:
+            if all(isinstance(outcome, (list, tuple)) and len(outcome) == 2 for outcome in market):
+                return [outcome_labels.id(label) for label, _ in market], [float(odd) for _, odd in market], False
+            return list(range(len(market))), [float(odd) for odd in market], True
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def find_dense_markets(match: dict, path: Tuple[str, ...] = ()) -> Dict[Tuple[str, ...], object]:
+    """returns the dense markets of a match by their path of keys"""
+    markets = {}
+    for k, v in match.items():
+        if k in DENSE_MARKETS:
+            markets[path + (k,)] = v
+        elif isinstance(v, dict):
+            markets.update(find_dense_markets(v, path + (k,)))
+    return markets
+
+def no_vig_dense(markets_odds: List[List[float]]) -> List[List[float]]:
+    """
+    Description
+    ----------
+    Removes the vig of a batch of dense markets in one pass, normalizing each market over all of its outcomes
+
+    Parameters
+    ----------
+    - markets_odds: List[List[float]]
+        The odds of every market of the batch
+
+    Returns
+    ------
+    - List[List[float]]: the no vig odds of every market
+    """
+    fair_odds = []
+    for odds in markets_odds:
+        probabilities = [1/odd for odd in odds]
+        total = sum(probabilities)
+        fair_odds.append([total/probability for probability in probabilities])
+    return fair_odds
+
+def align_markets(market1: Tuple[List[int], List[float], bool], market2: Tuple[List[int], List[float], bool]) -> List[Tuple[int, int, int]]:
+    """
+    Returns the (label id, index in market1, index in market2) of the outcomes offered in both markets,
+    in the order of market1
+    """
+    ids1, odds1, positional1 = market1
+    ids2, odds2, positional2 = market2
+    if positional1 != positional2 or (positional1 and len(ids1) != len(ids2)):
+        return []
+    index2 = {label_id: i for i, label_id in enumerate(ids2)}
+    return [(label_id, i, index2[label_id]) for i, label_id in enumerate(ids1) if label_id in index2]
+
+def compare_dense_markets(match1: dict, match2: dict, bookmaker1: str, bookmaker2: str, fair_prices: Dict[Tuple[str, ...], List[float]] = None) -> Dict[Tuple[str, ...], list]:
+    """
+    Description
+    ------------
+    Given two raw matches (before equalize_matches), compares their dense markets and determines the value bets.
+    The vig of all the dense markets of match1 is removed in one batch over their full set of outcomes,
+    before the outcomes are aligned with match2, unless their fair odds are given
+
+    Parameters
+    -----------
+    - match1: dict
+        The pinnacle match
+    - match2: dict
+        The match to compare with pinnacle
+    - bookmaker1: str
+        The name of the bookmaker offering match1
+    - bookmaker2: str
+        The name of the bookmaker offering match2
+    - fair_prices: Dict[Tuple[str, ...], List[float]]
+        Optional fair odds of the markets of match1 by market path, as computed by DevigEngine.devig_match
+
+    Returns
+    --------
+    - Dict[Tuple[str, ...], list]: the value bets of every dense market with at least one, by market path. The Condition
+      of a value bet is the position of its outcome unless the market is sent as labels and odds, in which case it is
+      the label of the outcome and the value bet is marked with "Labelled": True
+    """
+    markets1 = find_dense_markets(match1)
+    markets2 = find_dense_markets(match2)
+
+    paired_markets = []
+    for path, market in markets1.items():
+        if path in markets2:
+            dense1 = dense_market(market)
+            dense2 = dense_market(markets2[path])
+            if dense1 and dense2 and len(dense1[0]) > 1:
+                paired_markets.append((path, dense1, dense2))
+
+    fair_prices = fair_prices or {}
+    missing_markets = [dense1[1] for path, dense1, _ in paired_markets if path not in fair_prices]
+    missing_fair_odds = iter(no_vig_dense(missing_markets))
+    fair_odds = [fair_prices[path] if path in fair_prices else next(missing_fair_odds) for path, _, _ in paired_markets]
+
+    value_bets = {}
+    for (path, dense1, dense2), fair in zip(paired_markets, fair_odds):
+        market_value_bets = []
+        for label_id, i, j in align_markets(dense1, dense2):
+            roi = (dense2[1][j]/fair[i]) - 1
+            for max_odds, min_roi in DENSE_MARKET_ROI_BANDS:
+                if fair[i] <= max_odds:
+                    if roi >= min_roi:
+                        if dense1[2]:
+                            market_value_bets.append({"Condition": str(label_id), bookmaker1: fair[i], bookmaker2: dense2[1][j], "ROI": str(roi*100)+'%'})
+                        else:
+                            market_value_bets.append({"Condition": outcome_labels.label(label_id), "Labelled": True, bookmaker1: fair[i], bookmaker2: dense2[1][j], "ROI": str(roi*100)+'%'})
+                    break
+        if market_value_bets:
+            value_bets[path] = market_value_bets
+
+    return value_bets
@@ -0,0 +1,194 @@
+from collections import OrderedDict
+from dense_markets import DENSE_MARKETS, dense_market
+from typing import Callable, Dict, List, Tuple
+import math
+import threading
+
+# devig method by market type (the key of the market, or of its nearest ancestor which isn't a line such as "2.5"),
+# markets of any other type use the default_method of the DevigEngine
+DEFAULT_DEVIG_METHODS = {
+    "1X2": "shin",
+    "Correct Score": "shin",
+    "HT-FT": "shin",
+}
+
+def multiplicative(markets_odds: List[List[float]]) -> List[List[float]]:
+    """normalizes the implied probabilities of every market proportionally"""
+    fair_odds = []
+    for odds in markets_odds:
+        total = sum(1/odd for odd in odds)
+        fair_odds.append([odd*total for odd in odds])
+    return fair_odds
+
+def additive(markets_odds: List[List[float]]) -> List[List[float]]:
+    """removes the same share of the overround from every implied probability of a market"""
+    fair_odds = []
+    for odds, fallback in zip(markets_odds, multiplicative(markets_odds)):
+        probabilities = [1/odd for odd in odds]
+        margin = (sum(probabilities) - 1)/len(odds)
+        fair_probabilities = [probability - margin for probability in probabilities]
+        fair_odds.append([1/probability for probability in fair_probabilities] if min(fair_probabilities) > 0 else fallback)
+    return fair_odds
+
+def power(markets_odds: List[List[float]], iterations: int = 30, tolerance: float = 1e-12) -> List[List[float]]:
+    """
+    raises the implied probabilities of every market to the power k for which they sum to 1,
+    k is solved by Newton's method for all the markets of the batch in lockstep
+    """
+    probabilities = [[1/odd for odd in odds] for odds in markets_odds]
+    exponents = [1.0]*len(markets_odds)
+    pending = [i for i, market in enumerate(probabilities) if max(market) < 1]
+
+    for _ in range(iterations):
+        if not pending:
+            break
+        still_pending = []
+        for i in pending:
+            powers = [probability**exponents[i] for probability in probabilities[i]]
+            total = sum(powers) - 1
+            derivative = sum(p*math.log(probability) for p, probability in zip(powers, probabilities[i]))
+            exponents[i] -= total/derivative
+            if abs(total) > tolerance:
+                still_pending.append(i)
+        pending = still_pending
+
+    fair_odds = []
+    for odds, market, exponent, fallback in zip(markets_odds, probabilities, exponents, multiplicative(markets_odds)):
+        fair_odds.append([1/probability**exponent for probability in market] if max(market) < 1 else fallback)
+    return fair_odds
+
+def shin(markets_odds: List[List[float]], iterations: int = 60) -> List[List[float]]:
+    """
+    Shin's method, which attributes the overround to insider trading and so removes more of it from the longshots.
+    The insider share z of every market is solved by bisection for all the markets of the batch in lockstep
+    """
+    probabilities = [[1/odd for odd in odds] for odds in markets_odds]
+    totals = [sum(market) for market in probabilities]
+
+    def shin_probabilities(market: List[float], total: float, z: float) -> List[float]:
+        return [(math.sqrt(z*z + 4*(1 - z)*probability*probability/total) - z)/(2*(1 - z)) for probability in market]
+
+    pending = [i for i, total in enumerate(totals) if total > 1]
+    lower = [0.0]*len(markets_odds)
+    upper = [0.5]*len(markets_odds)
+    for _ in range(iterations):
+        for i in pending:
+            z = (lower[i] + upper[i])/2
+            if sum(shin_probabilities(probabilities[i], totals[i], z)) > 1:
+                lower[i] = z
+            else:
+                upper[i] = z
+
+    fair_odds = []
+    for i, fallback in enumerate(multiplicative(markets_odds)):
+        if totals[i] > 1:
+            fair_probabilities = shin_probabilities(probabilities[i], totals[i], (lower[i] + upper[i])/2)
+            norm = sum(fair_probabilities)
+            fair_odds.append([norm/probability for probability in fair_probabilities])
+        else:
+            fair_odds.append(fallback)
+    return fair_odds
+
+DEVIG_METHODS: Dict[str, Callable[[List[List[float]]], List[List[float]]]] = {
+    "multiplicative": multiplicative,
+    "additive": additive,
+    "power": power,
+    "shin": shin,
+}
+
+def _is_line(key: str) -> bool:
+    try:
+        float(key)
+        return True
+    except ValueError:
+        return False
+
+def _pinnacle_markets(match: dict, path: Tuple[str, ...] = (), market_type: str = None) -> Dict[Tuple[str, ...], Tuple[str, List[float]]]:
+    """returns the (market type, odds) of every market of a match with at least two outcomes, by path"""
+    markets = {}
+    for k, v in match.items():
+        key_type = market_type if _is_line(k) else k
+        if k in DENSE_MARKETS:
+            dense = dense_market(v)
+            if dense and len(dense[1]) > 1:
+                markets[path + (k,)] = (k, dense[1])
+        elif isinstance(v, list):
+            if k != "teams" and len(v) > 1 and all(isinstance(odd, (int, float)) and odd > 1 for odd in v):
+                markets[path + (k,)] = (key_type, v)
+        elif isinstance(v, dict):
+            markets.update(_pinnacle_markets(v, path + (k,), key_type))
+    return markets
+
+class DevigEngine:
+    """
+    Description
+    --------------
+    DevigEngine computes the fair odds of all the markets of a pinnacle match in one batch per devig method
+    (multiplicative, additive, power or Shin, selectable per market type) and caches them per pinnacle odds version,
+    so that a pinnacle match compared with several bookmakers is only devigged once. Only the fair odds are cached,
+    the devigged match is rebuilt from them on every call
+
+    Parameters
+    ------------
+    - methods: Dict[str, str]
+        The devig method of every market type
+    - default_method: str
+        The devig method of the market types missing from methods
+    - cache_size: int
+        The number of pinnacle odds versions whose fair odds are kept in the cache, the least recently used ones are dropped first
+
+    Methods
+    -------------
+    - devig_match(match) -> Tuple[dict, dict]
+        Returns the match with the fair odds of its list markets (as update_match_scoreboard(match, no_vig_odds) does)
+        and the fair odds of all its markets, dense ones included, by market path
+    """
+
+    def __init__(self, methods: Dict[str, str] = DEFAULT_DEVIG_METHODS, default_method: str = "multiplicative", cache_size: int = 1000):
+
+        for method in list(methods.values()) + [default_method]:
+            if method not in DEVIG_METHODS:
+                raise ValueError(f"Unknown devig method {method}, the methods are {list(DEVIG_METHODS)}")
+        self.methods = methods
+        self.default_method = default_method
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def devig_match(self, match: dict) -> Tuple[dict, dict]:
+        version = (match["_id"], match.get("last_modified_date"), match.get("last_modified_time"))
+        with self._lock:
+            fair_prices = self._cache.get(version)
+            if fair_prices is not None:
+                self._cache.move_to_end(version)
+
+        if fair_prices is None:
+            fair_prices = self.fair_prices(match)
+            with self._lock:
+                self._cache[version] = fair_prices
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return self._replace_markets(match, fair_prices), fair_prices
+
+    def fair_prices(self, match: dict) -> Dict[Tuple[str, ...], List[float]]:
+        batches = {}
+        for path, (market_type, odds) in _pinnacle_markets(match).items():
+            method = self.methods.get(market_type, self.default_method)
+            batches.setdefault(method, []).append((path, odds))
+
+        fair_prices = {}
+        for method, markets in batches.items():
+            for (path, _), fair in zip(markets, DEVIG_METHODS[method]([odds for _, odds in markets])):
+                fair_prices[path] = fair
+        return fair_prices
+
+    def _replace_markets(self, match: dict, fair_prices: Dict[Tuple[str, ...], List[float]], path: Tuple[str, ...] = ()) -> dict:
+        devigged_match = {}
+        for k, v in match.items():
+            if isinstance(v, list) and path + (k,) in fair_prices:
+                devigged_match[k] = fair_prices[path + (k,)]
+            elif isinstance(v, dict) and k not in DENSE_MARKETS:
+                devigged_match[k] = self._replace_markets(v, fair_prices, path + (k,))
+            else:
+                devigged_match[k] = v
+        return devigged_match
@@ -2,6 +2,7 @@ from typing import Tuple, Callable, List, Union
 from datetime import datetime
 import hashlib
 from thefuzz import fuzz
+from dense_markets import compare_dense_markets
 
 def equalize_matches(match1: dict, match2: dict) -> Tuple[dict, dict]:
     """
@@ -167,7 +168,7 @@ def add_timestamps(self, doc: dict) -> dict:
     doc['created_time'] = time
     return doc
 
-def compare_markets(match1: dict, match2: dict, bookmaker1: str, bookmaker2: str) -> dict:
+def compare_markets(match1: dict, match2: dict, bookmaker1: str, bookmaker2: str, clock: Callable[[], datetime] = datetime.utcnow) -> dict:
     """
     Description
     ------------
@@ -183,6 +184,8 @@ def compare_markets(match1: dict, match2: dict, bookmaker1: str, bookmaker2: str
         The name of the bookmaker offering match1
     - bookmaker2: str
         The name of the bookmaker offering match2
+    - clock: Callable[[], datetime]
+        Returns the current UTC time, used for the created date and time and the value bet age
         
     Returns:
     - dict: the final match after comparison, representing the value bets
@@ -201,7 +204,7 @@ def compare_markets(match1: dict, match2: dict, bookmaker1: str, bookmaker2: str
         final_match["date"] = f'{match1["date"]} | {match2["date"]}'
         final_match["time"] = f'{match1["time"]} | {match2["time"]}'
         final_match["is_live"] = match1["is_live"]
-        now = datetime.utcnow()
+        now = clock()
         date = now.strftime("%d/%m/%y")
         time = now.strftime("%H:%M:%S")
         final_match['created_date'] = date
@@ -236,10 +239,52 @@ def compare_markets(match1: dict, match2: dict, bookmaker1: str, bookmaker2: str
                     
         elif isinstance(v, dict):
             if k != "Correct Score":
-                final_match[k] = compare_markets(v, match2[k], bookmaker1, bookmaker2)
+                final_match[k] = compare_markets(v, match2[k], bookmaker1, bookmaker2, clock)
 
     return final_match
 
+def compare_match_pair(match1: dict, match2: dict, include_dense_markets: bool = True, devig_engine = None, clock: Callable[[], datetime] = datetime.utcnow) -> dict:
+    """
+    Description
+    ------------
+    Compares a pinnacle match with the match of another bookmaker and returns the final match representing the value bets
+    
+    Parameters
+    ----------- 
+    - match1: dict
+        The pinnacle match
+    - match2: dict
+        The match to compare with pinnacle
+    - include_dense_markets: bool
+        Whether the dense markets (Correct Score, HT-FT) are compared as well
+    - devig_engine: DevigEngine
+        Optional engine computing (and caching) the fair odds of match1, by default no_vig_odds is used
+    - clock: Callable[[], datetime]
+        Returns the current UTC time, as for compare_markets
+        
+    Returns:
+    - dict: the final match after comparison, without its false fields
+    """
+    bookmaker1 = match1['bookmaker_name']
+    bookmaker2 = match2['bookmaker_name']
+    if devig_engine:
+        devigged_match1, fair_prices = devig_engine.devig_match(match1)
+        equalized_match1, equalized_match2 = equalize_matches(devigged_match1, match2)
+    else:
+        fair_prices = None
+        equalized_match1, equalized_match2 = equalize_matches(match1, match2)
+        equalized_match1 = update_match_scoreboard(equalized_match1, no_vig_odds)
+    final_match = compare_markets(equalized_match1, equalized_match2, bookmaker1, bookmaker2, clock)
+    
+    if include_dense_markets:
+        for path, value_bets in compare_dense_markets(match1, match2, bookmaker1, bookmaker2, fair_prices).items():
+            market = final_match
+            for k in path[:-1]:
+                market = market.setdefault(k, {})
+            market[path[-1]] = value_bets
+    
+    return remove_false_fields(final_match)
+
 def remove_false_fields(input_dict: dict) -> dict:
     """
     Recursively removes false fields from a given dictionary or list
@@ -305,4 +350,16 @@ def find_similar_football_match(match_list: list, match: dict) -> dict:
     if best_ratio >= 45:
         return best_match
     else:
-        return None
\ No newline at end of file
+        return None
+
+def match_kickoff(match: dict) -> datetime:
+    """
+    Returns the kickoff of a match as a datetime, built from its date ("%d/%m/%y") and time ("%H:%M") fields
+    """
+    return datetime.strptime(f'{match["date"]} {match["time"]}', "%d/%m/%y %H:%M")
+
+def odds_fingerprint(match: dict) -> int:
+    """
+    Returns a fingerprint of the odds of a match, ignoring the fields which change on every scrape
+    """
+    return hash(repr([(k, v) for k, v in sorted(match.items()) if isinstance(v, (list, dict)) and k != "teams"]))
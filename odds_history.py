@@ -0,0 +1,240 @@
+from array import array
+from datetime import datetime, timezone
+from arbitrage import flatten_markets
+from dense_markets import dense_market, find_dense_markets, outcome_labels
+from helper_functions import match_kickoff
+from typing import Dict, List, Tuple
+import os
+import sqlite3
+import struct
+import threading
+
+INDEX_FILE = 'index.sqlite3'
+SEGMENT_FILE = 'odds-{:05d}.seg'
+BLOCK_HEADER = struct.Struct('<4sII')
+BLOCK_MAGIC = b'ODDS'
+COLUMN_TYPECODES = ('d', 'I', 'f')
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fixtures (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, kickoff REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS fixtures_by_kickoff ON fixtures (kickoff);
+CREATE TABLE IF NOT EXISTS markets (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS blocks (fixture_id INTEGER NOT NULL, segment INTEGER NOT NULL, offset INTEGER NOT NULL, position INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS blocks_by_fixture ON blocks (fixture_id);
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value REAL NOT NULL);
+"""
+
+def market_odds(match: dict) -> Dict[str, float]:
+    """
+    Returns the odds of every outcome of a match by "market path#condition", the condition being the index of
+    the outcome for list markets and its label for dense markets
+    """
+    odds = {}
+    for path, market in flatten_markets(match).items():
+        for i, odd in enumerate(market):
+            odds[f"{path}#{i}"] = odd
+    for path, market in find_dense_markets(match).items():
+        dense = dense_market(market)
+        if dense:
+            label_ids, outcome_odds, positional = dense
+            for label_id, odd in zip(label_ids, outcome_odds):
+                odds[f"{'.'.join(path)}#{label_id if positional else outcome_labels.label(label_id)}"] = odd
+    return odds
+
+def _float32(value: float) -> float:
+    return array('f', [value])[0]
+
+def _timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+class OddsHistoryStore:
+    """
+    Description
+    --------------
+    OddsHistoryStore appends the odds of the matched pairs of every cycle to a compact columnar store, recording
+    only the outcomes whose odds changed since they were last recorded. Fixtures and markets are interned to integer
+    ids and each flush writes one block to an append-only segment file: its rows are grouped by fixture, a directory
+    gives the id and first row of every fixture and the columns hold the timestamps (float64), market ids (uint32)
+    and odds (float32). A SQLite index keyed by fixture id gets one (segment, offset, position) row per fixture of
+    every block, so the history of a fixture, even long after its kickoff, is one index lookup and only reads the
+    rows of that fixture. The ids and last recorded odds of a fixture are only kept in memory until evict_after
+    seconds after its kickoff. After a restart the first cycle records every outcome again
+
+    Parameters
+    ------------
+    - path: str
+        The directory of the store
+    - segment_size: int
+        The size in bytes after which a new segment file is started
+    - evict_after: float
+        The time in seconds after the kickoff of a fixture after which it is evicted from memory, 3 hours by default
+        so that the in-play odds of a live finder are still recorded as deltas
+
+    Methods
+    -------------
+    - append(fixture, bookmaker_match, timestamp)
+        Buffers the changed odds of a bookmaker's match of a fixture
+    - flush()
+        Writes the buffered odds as one block, indexes it and evicts the fixtures which kicked off
+    - history(fixture) -> Dict[str, List[Tuple[datetime, float]]]
+        Returns the odds history of every "bookmaker|market path#condition" of a fixture
+    - close()
+        Closes the index
+    """
+
+    def __init__(self, path: str, segment_size: int = 64*1024*1024, evict_after: float = 3*3600):
+
+        self.path = path
+        self.segment_size = segment_size
+        self.evict_after = evict_after
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._index = sqlite3.connect(os.path.join(path, INDEX_FILE), check_same_thread=False)
+        self._index.executescript(INDEX_SCHEMA)
+
+        state = dict(self._index.execute("SELECT key, value FROM state"))
+        self._segment = int(state.get("segment", 0))
+        self._latest = state.get("latest", 0.0)
+        self._market_ids = {name: market_id for market_id, name in self._index.execute("SELECT id, name FROM markets")}
+        self._new_markets = []
+
+        # only the fixtures which haven't been evicted yet are loaded
+        self._fixture_ids = {}
+        self._kickoffs = {}
+        for fixture_id, name, kickoff in self._index.execute("SELECT id, name, kickoff FROM fixtures WHERE kickoff >= ?", (self._latest - self.evict_after,)):
+            self._fixture_ids[name] = fixture_id
+            self._kickoffs[name] = kickoff
+
+        self._last_odds = {}
+        self._buffers = {}
+
+    def append(self, fixture: str, bookmaker_match: dict, timestamp: datetime):
+        odds = market_odds(bookmaker_match)
+        timestamp = _timestamp(timestamp)
+        with self._lock:
+            self._latest = max(self._latest, timestamp)
+            if fixture not in self._kickoffs:
+                self._kickoffs[fixture] = _timestamp(match_kickoff(bookmaker_match))
+            last_odds = self._last_odds.setdefault(fixture, {})
+            buffer = None
+            for market, odd in odds.items():
+                market_id = self._market_id(f"{bookmaker_match['bookmaker_name']}|{market}")
+                odd = _float32(odd)
+                if last_odds.get(market_id) != odd:
+                    last_odds[market_id] = odd
+                    if buffer is None:
+                        buffer = self._buffers.setdefault(fixture, tuple(array(typecode) for typecode in COLUMN_TYPECODES))
+                    buffer[0].append(timestamp)
+                    buffer[1].append(market_id)
+                    buffer[2].append(odd)
+
+    def flush(self):
+        with self._lock:
+            if self._buffers:
+                with self._index:
+                    self._write_block()
+            self._evict()
+
+    def history(self, fixture: str) -> Dict[str, List[Tuple[datetime, float]]]:
+        with self._lock:
+            blocks = self._index.execute(
+                "SELECT blocks.fixture_id, segment, offset, position FROM blocks JOIN fixtures ON fixtures.id = blocks.fixture_id WHERE fixtures.name = ? ORDER BY blocks.rowid",
+                (fixture,)).fetchall()
+            market_names = {market_id: name for name, market_id in self._market_ids.items()}
+
+        history = {}
+        segment_files = {}
+        try:
+            for fixture_id, segment, offset, position in blocks:
+                if segment not in segment_files:
+                    segment_files[segment] = open(os.path.join(self.path, SEGMENT_FILE.format(segment)), 'rb')
+                timestamps, markets, odds = self._read_rows(segment_files[segment], offset, position, fixture_id)
+                for i in range(len(odds)):
+                    history.setdefault(market_names[markets[i]], []).append((datetime.utcfromtimestamp(timestamps[i]), odds[i]))
+        finally:
+            for f in segment_files.values():
+                f.close()
+        return history
+
+    def close(self):
+        with self._lock:
+            self._index.close()
+
+    def _write_block(self):
+        """writes the buffered odds as one block and indexes it, within a transaction of the index"""
+        fixtures = list(self._buffers)
+        fixture_ids = array('I', [self._fixture_id(fixture) for fixture in fixtures])
+        first_rows = array('I', [0])
+        for fixture in fixtures:
+            first_rows.append(first_rows[-1] + len(self._buffers[fixture][2]))
+
+        segment_path = os.path.join(self.path, SEGMENT_FILE.format(self._segment))
+        if os.path.exists(segment_path) and os.path.getsize(segment_path) >= self.segment_size:
+            self._segment += 1
+            segment_path = os.path.join(self.path, SEGMENT_FILE.format(self._segment))
+
+        with open(segment_path, 'ab') as f:
+            offset = f.tell()
+            f.write(BLOCK_HEADER.pack(BLOCK_MAGIC, first_rows[-1], len(fixtures)))
+            f.write(fixture_ids.tobytes())
+            f.write(first_rows.tobytes())
+            for column in range(len(COLUMN_TYPECODES)):
+                for fixture in fixtures:
+                    f.write(self._buffers[fixture][column].tobytes())
+
+        self._index.executemany("INSERT INTO markets (id, name) VALUES (?, ?)", self._new_markets)
+        self._index.executemany("INSERT INTO blocks (fixture_id, segment, offset, position) VALUES (?, ?, ?, ?)",
+                                [(fixture_id, self._segment, offset, position) for position, fixture_id in enumerate(fixture_ids)])
+        self._index.executemany("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", [("segment", self._segment), ("latest", self._latest)])
+        self._new_markets = []
+        self._buffers = {}
+
+    def _read_rows(self, f, offset: int, position: int, fixture_id: int) -> Tuple[array, array, array]:
+        """reads the rows of the fixture at position in the directory of the block at offset"""
+        f.seek(offset)
+        magic, rows, fixtures = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+        if magic != BLOCK_MAGIC:
+            raise ValueError(f"No odds block at offset {offset} of {f.name}")
+        directory = array('I')
+        f.seek(offset + BLOCK_HEADER.size + position*directory.itemsize)
+        directory.fromfile(f, 1)
+        if directory[0] != fixture_id:
+            raise ValueError(f"The odds block at offset {offset} of {f.name} doesn't hold fixture {fixture_id} at position {position}")
+        f.seek(offset + BLOCK_HEADER.size + (fixtures + position)*directory.itemsize)
+        directory.fromfile(f, 2)
+        start, end = directory[1], directory[2]
+
+        columns = []
+        column_offset = offset + BLOCK_HEADER.size + (2*fixtures + 1)*directory.itemsize
+        for typecode in COLUMN_TYPECODES:
+            column = array(typecode)
+            f.seek(column_offset + start*column.itemsize)
+            column.fromfile(f, end - start)
+            columns.append(column)
+            column_offset += rows*column.itemsize
+        return tuple(columns)
+
+    def _evict(self):
+        """drops the ids and last odds kept in memory for the fixtures which kicked off evict_after seconds ago"""
+        horizon = self._latest - self.evict_after
+        for fixture in [fixture for fixture, kickoff in self._kickoffs.items() if kickoff < horizon and fixture not in self._buffers]:
+            del self._kickoffs[fixture]
+            self._fixture_ids.pop(fixture, None)
+            self._last_odds.pop(fixture, None)
+
+    def _fixture_id(self, fixture: str) -> int:
+        fixture_id = self._fixture_ids.get(fixture)
+        if fixture_id is None:
+            # a fixture seen again after its eviction keeps its id
+            row = self._index.execute("SELECT id FROM fixtures WHERE name = ?", (fixture,)).fetchone()
+            if row is None:
+                row = (self._index.execute("INSERT INTO fixtures (name, kickoff) VALUES (?, ?)", (fixture, self._kickoffs[fixture])).lastrowid,)
+            fixture_id = self._fixture_ids[fixture] = row[0]
+        return fixture_id
+
+    def _market_id(self, market: str) -> int:
+        market_id = self._market_ids.get(market)
+        if market_id is None:
+            market_id = self._market_ids[market] = len(self._market_ids)
+            self._new_markets.append((market_id, market))
+        return market_id
@@ -0,0 +1,143 @@
+from datetime import datetime
+from pymongo.collection import Collection
+from logger import WebScraperLogger
+from typing import Callable, Iterable, Tuple
+import pymongo
+import threading
+import time
+
+class CyclePacer:
+    """
+    Description
+    --------------
+    CyclePacer replaces the busy while-True loop around find_value_bets_and_update_db. Before each cycle it checks a
+    cheap change signal of the bookmaker collections (their document count and the latest last_modified_time of the
+    day, read through the change_signal index it creates) and skips the cycle while nothing moved upstream, up to
+    max_idle seconds. The change signal is polled less often the longer nothing moves and failed cycles are retried
+    with an exponential backoff
+
+    Parameters
+    ------------
+    - logger: WebScraperLogger
+        The logger to log any information while pacing
+    - idle_interval: float
+        The time in seconds to wait before checking the change signal again after it last moved
+    - max_idle_interval: float
+        The maximum time in seconds to wait before checking the change signal again, the wait is doubled on every
+        check where nothing moved
+    - max_idle: float
+        The maximum time in seconds without a cycle, a cycle is run after it even if nothing moved
+    - min_backoff: float
+        The time in seconds to wait after the first failed cycle, doubled on every consecutive failure
+    - max_backoff: float
+        The maximum time in seconds to wait after a failed cycle
+    - clock: Callable[[], datetime]
+        Returns the current UTC time, used to read the change signal of the day
+
+    Methods
+    -------------
+    - ensure_indexes(collections)
+        Creates the index the change signal is read through on every collection
+    - change_signal(collections) -> tuple
+        Returns the change signal of the collections
+    - run(cycle, collections, stop_event)
+        Runs cycle whenever the collections changed, until stop_event is set
+    - stats -> dict
+        The cycle, skip and failure counts, the cycle durations and the idle time
+    """
+
+    def __init__(
+                 self,
+                 logger: WebScraperLogger,
+                 idle_interval: float = 1,
+                 max_idle_interval: float = 8,
+                 max_idle: float = 30,
+                 min_backoff: float = 1,
+                 max_backoff: float = 300,
+                 clock: Callable[[], datetime] = datetime.utcnow
+                 ):
+
+                self.logger = logger
+                self.idle_interval = idle_interval
+                self.max_idle_interval = max_idle_interval
+                self.max_idle = max_idle
+                self.min_backoff = min_backoff
+                self.max_backoff = max_backoff
+                self.clock = clock
+                self.stats = {
+                    "cycles": 0,
+                    "skipped_cycles": 0,
+                    "failures": 0,
+                    "consecutive_failures": 0,
+                    "last_cycle_duration": 0.0,
+                    "mean_cycle_duration": 0.0,
+                    "idle_time": 0.0,
+                    "backoff_time": 0.0
+                }
+
+    def ensure_indexes(self, collections: Iterable[Collection]):
+        for collection in collections:
+            try:
+                collection.create_index([("last_modified_date", pymongo.ASCENDING), ("last_modified_time", pymongo.DESCENDING)], name="change_signal")
+            except Exception as e:
+                self.logger.warning(f"An exception of type {type(e).__name__} occurred while creating the change_signal index of {collection.name}: {str(e)}")
+
+    def change_signal(self, collections: Iterable[Collection]) -> Tuple:
+        today = self.clock().strftime("%d/%m/%y")
+        signal = []
+        for collection in collections:
+            latest = collection.find_one({"last_modified_date": today}, projection={"last_modified_time": 1, "_id": 0}, sort=[("last_modified_time", pymongo.DESCENDING)])
+            signal.append((collection.name, collection.estimated_document_count(), today, latest and latest.get("last_modified_time")))
+        return tuple(signal)
+
+    def run(self, cycle: Callable[[], object], collections: Iterable[Collection], stop_event: threading.Event):
+        collections = list({collection.name: collection for collection in collections}.values())
+        self.ensure_indexes(collections)
+        last_signal = None
+        last_cycle_end = None
+        idle_interval = self.idle_interval
+
+        while not stop_event.is_set():
+
+            try:
+                signal = self.change_signal(collections)
+            except Exception as e:
+                self.logger.warning(f"An exception of type {type(e).__name__} occurred while reading the change signal: {str(e)}")
+                signal = None
+
+            idle_left = self.max_idle - (time.monotonic() - last_cycle_end) if last_cycle_end is not None else 0
+            if signal is not None and signal == last_signal and idle_left > 0:
+                self.stats["skipped_cycles"] += 1
+                self._wait(stop_event, min(idle_interval, idle_left), "idle_time")
+                idle_interval = min(idle_interval*2, self.max_idle_interval)
+                continue
+            idle_interval = self.idle_interval
+
+            start = time.monotonic()
+            error = None
+            try:
+                cycle()
+            except Exception as e:
+                error = e
+            last_cycle_end = time.monotonic()
+            self._record_cycle(last_cycle_end - start)
+
+            if error is None:
+                last_signal = signal
+                self.stats["consecutive_failures"] = 0
+            else:
+                self.stats["failures"] += 1
+                self.stats["consecutive_failures"] += 1
+                backoff = min(self.min_backoff * 2**(self.stats["consecutive_failures"] - 1), self.max_backoff)
+                self.logger.error(f"An exception of type {type(error).__name__} occurred while running a cycle: {str(error)}, retrying in {backoff:.0f}s")
+                self._wait(stop_event, backoff, "backoff_time")
+
+    def _record_cycle(self, duration: float):
+        self.stats["cycles"] += 1
+        self.stats["last_cycle_duration"] = duration
+        self.stats["mean_cycle_duration"] += (duration - self.stats["mean_cycle_duration"]) / self.stats["cycles"]
+
+    def _wait(self, stop_event: threading.Event, seconds: float, stat: str):
+        start = time.monotonic()
+        stop_event.wait(seconds)
+        self.stats[stat] += time.monotonic() - start
@@ -0,0 +1,192 @@
+from collections import deque
+from datetime import datetime
+from logger import WebScraperLogger
+from typing import Iterable, Tuple
+import json
+import os
+import socket
+import threading
+
+# the fields of a value bet which change whenever it is written again (in both schema versions), a value bet whose
+# other fields didn't change is not published again
+BOOKKEEPING_FIELDS = ("created_date", "created_time", "value_bet_age", "created_at", "odds_age")
+
+def diff_documents(old: dict, new: dict, prefix: str = '') -> Tuple[dict, list]:
+    """
+    Description
+    -----------
+    Computes the difference between two documents, nested dictionaries are compared recursively and
+    lists are replaced as a whole
+
+    Returns
+    --------
+    - Tuple[dict, list]: the fields to set (by dotted path) and the dotted paths of the fields to unset
+    """
+    set_fields = {}
+    unset_fields = []
+
+    for k, v in new.items():
+        path = prefix + str(k)
+        if k not in old:
+            set_fields[path] = v
+        elif isinstance(v, dict) and isinstance(old[k], dict):
+            nested_set, nested_unset = diff_documents(old[k], v, path + '.')
+            set_fields.update(nested_set)
+            unset_fields.extend(nested_unset)
+        elif v != old[k]:
+            set_fields[path] = v
+
+    for k in old:
+        if k not in new:
+            unset_fields.append(prefix + str(k))
+
+    return set_fields, unset_fields
+
+class _Client:
+    """A connected consumer with its own bounded event buffer and writer thread"""
+
+    def __init__(self, connection: socket.socket, buffer_size: int):
+        self.connection = connection
+        self.buffer = deque()
+        self.buffer_size = buffer_size
+        self.condition = threading.Condition()
+        self.closed = False
+
+    def put(self, event: bytes):
+        with self.condition:
+            if len(self.buffer) >= self.buffer_size:
+                # the client is too slow, drop its backlog and tell it to resync from the value_bet_collection
+                self.buffer.clear()
+                self.buffer.append(_encode({"type": "reset"}))
+            else:
+                self.buffer.append(event)
+            self.condition.notify()
+
+    def run(self):
+        try:
+            while True:
+                with self.condition:
+                    while not self.buffer and not self.closed:
+                        self.condition.wait()
+                    if self.closed:
+                        return
+                    events = list(self.buffer)
+                    self.buffer.clear()
+                self.connection.sendall(b''.join(events))
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        try:
+            self.connection.close()
+        except OSError:
+            pass
+
+def _encode(event: dict) -> bytes:
+    event["ts"] = datetime.utcnow().isoformat()
+    return (json.dumps(event, default=str) + '\n').encode()
+
+class ValueBetPublisher:
+    """
+    Description
+    --------------
+    ValueBetPublisher pushes value bet events to local consumers over a Unix socket stream, as soon as they are found.
+    Each event is a JSON line: "create" carries the full value bet, "update" only the fields which changed
+    ("set" by dotted path and "unset"), sent only when a field other than the BOOKKEEPING_FIELDS changed, and "expire" the _id of a value bet which is no longer available.
+    New consumers first receive a "create" event for every current value bet. A consumer which falls more than
+    buffer_size events behind loses its backlog and receives a "reset" event, after which it should resync
+    from the value_bet_collection
+
+    Parameters
+    ------------
+    - socket_path: str
+        The path of the Unix socket consumers connect to
+    - logger: WebScraperLogger
+        The logger to log any information while publishing
+    - buffer_size: int
+        The maximum number of events buffered for each consumer
+
+    Methods
+    -------------
+    - start()
+        Starts accepting consumers
+    - publish(value_bet)
+        Publishes a create or update event for a value bet
+    - expire(ids_of_available_value_bets)
+        Publishes an expire event for every published value bet which is not available anymore
+    - close()
+        Disconnects all consumers and removes the socket
+    """
+
+    def __init__(self, socket_path: str, logger: WebScraperLogger, buffer_size: int = 10000):
+
+        self.socket_path = socket_path
+        self.logger = logger
+        self.buffer_size = buffer_size
+        self._published = {}
+        self._clients = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        self._server.listen()
+        threading.Thread(target=self._accept, daemon=True).start()
+        self.logger.info(f"Publishing value bets on {self.socket_path}")
+
+    def publish(self, value_bet: dict):
+        with self._lock:
+            previous = self._published.get(value_bet['_id'])
+            if previous is None:
+                event = {"type": "create", "_id": value_bet['_id'], "doc": value_bet}
+            else:
+                set_fields, unset_fields = diff_documents(previous, value_bet)
+                if all(path.split('.')[0] in BOOKKEEPING_FIELDS for path in list(set_fields) + unset_fields):
+                    return
+                event = {"type": "update", "_id": value_bet['_id'], "set": set_fields, "unset": unset_fields}
+            self._published[value_bet['_id']] = value_bet
+            self._broadcast(_encode(event))
+
+    def expire(self, ids_of_available_value_bets: Iterable[str]):
+        available = set(ids_of_available_value_bets)
+        with self._lock:
+            for _id in [_id for _id in self._published if _id not in available]:
+                del self._published[_id]
+                self._broadcast(_encode({"type": "expire", "_id": _id}))
+
+    def close(self):
+        if self._server:
+            self._server.close()
+            self._server = None
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients = []
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def _broadcast(self, event: bytes):
+        self._clients = [client for client in self._clients if not client.closed]
+        for client in self._clients:
+            client.put(event)
+
+    def _accept(self):
+        while self._server:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                return
+            client = _Client(connection, self.buffer_size)
+            with self._lock:
+                for value_bet in self._published.values():
+                    client.put(_encode({"type": "create", "_id": value_bet['_id'], "doc": value_bet}))
+                self._clients.append(client)
+            threading.Thread(target=client.run, daemon=True).start()
@@ -0,0 +1,90 @@
+"""
+Replays a snapshot captured by the SnapshotRecorder of a finder job and compares the time each replayed cycle
+takes with the duration recorded in production
+
+usage: python replay.py <snapshot path> [job name] [--no-latency]
+"""
+from snapshot import SnapshotReplay, SinkCollection
+from value_bet_finder import ValueBetFinder
+from scheduler import RefreshScheduler
+from devig import DevigEngine
+from logger import WebScraperLogger
+from runner import DEFAULT_MAX_POOL_SIZE, LOG_PATH, job_competitions
+from typing import List
+from time import monotonic
+import sys
+
+def replay_finder(job: dict, snapshot: SnapshotReplay, logger: WebScraperLogger) -> ValueBetFinder:
+    """
+    Builds the ValueBetFinder of a job configuration over the collections of a snapshot. The value bets and arbitrages
+    are kept in SinkCollections and the options with side effects or timing dependent behaviour (publisher, snapshot,
+    odds history, output schema, task deadline and circuit breakers) are left out, so that replays are deterministic
+    """
+    pinnacle_collection = snapshot.collection(job["pinnacle_collection"])
+    max_pool_size = job.get("max_pool_size", DEFAULT_MAX_POOL_SIZE)
+
+    return ValueBetFinder(
+                    paired_collections=[(pinnacle_collection, snapshot.collection(name)) for name in job["bookmaker_collections"]],
+                    value_bet_collection=SinkCollection(job["value_bet_collection"]),
+                    logger=logger,
+                    line=job.get("line", 0),
+                    competitions=job_competitions(job),
+                    thread_pool_workers=min(job.get("thread_pool_workers", max_pool_size), max_pool_size),
+                    date_range=job.get("date_range", 3),
+                    scheduler=RefreshScheduler(**job["scheduler"]) if "scheduler" in job else None,
+                    clock=snapshot.clock,
+                    arbitrage_collection=SinkCollection(job["arbitrage_collection"]) if "arbitrage_collection" in job else None,
+                    devig_engine=DevigEngine(**job["devig"]) if "devig" in job else None
+                    )
+
+def replay(path: str, job: dict, simulate_latency: bool = True) -> List[dict]:
+    """
+    Description
+    ------------
+    Replays every cycle of a snapshot with the finder of job and prints the replayed and recorded duration of each cycle
+
+    Returns
+    --------
+    - List[dict]: the started_at, recorded duration, replayed duration and number of value bets of every cycle
+    """
+    snapshot = SnapshotReplay(path, simulate_latency=simulate_latency)
+    finder = replay_finder(job, snapshot, WebScraperLogger(name=job["name"], log_file_path=LOG_PATH))
+    timings = []
+
+    try:
+        for i, cycle in enumerate(snapshot.cycles()):
+            start = monotonic()
+            value_bets_found = finder.find_value_bets_and_update_db()
+            duration = monotonic() - start
+            timings.append({"started_at": cycle["started_at"], "recorded": cycle["duration"], "replayed": duration, "value_bets": value_bets_found})
+            print(f"cycle {i + 1}/{len(snapshot)} {cycle['started_at']}: replayed in {duration:.2f}s, recorded {cycle['duration']:.2f}s ({duration/cycle['duration']*100 if cycle['duration'] else 0:.0f}%), {value_bets_found} value bets")
+    finally:
+        snapshot.close()
+
+    if timings:
+        recorded = sum(timing["recorded"] for timing in timings)
+        replayed = sum(timing["replayed"] for timing in timings)
+        print(f"{len(timings)} cycles: replayed in {replayed:.2f}s, recorded {recorded:.2f}s ({replayed/recorded*100 if recorded else 0:.0f}%)")
+    return timings
+
+def main(path: str, job_name: str = None, simulate_latency: bool = True) -> int:
+    from football_line_value_bet_finder import FOOTBALL_LINE_JOB
+    from football_live_value_bet_finder import FOOTBALL_LIVE_JOB
+    jobs = [FOOTBALL_LINE_JOB, FOOTBALL_LIVE_JOB]
+
+    if job_name is None:
+        # the job whose pinnacle collection was recorded in the snapshot
+        collection_names = SnapshotReplay(path).collection_names()
+        matching_jobs = [job for job in jobs if job["pinnacle_collection"] in collection_names]
+    else:
+        matching_jobs = [job for job in jobs if job["name"] == job_name]
+    if not matching_jobs:
+        print(f"No job matches the snapshot {path}, the jobs are {[job['name'] for job in jobs]}")
+        return 1
+
+    replay(path, matching_jobs[0], simulate_latency)
+    return 0
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--no-latency"]
+    sys.exit(main(*args, simulate_latency="--no-latency" not in sys.argv[1:]))
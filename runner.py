@@ -0,0 +1,212 @@
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
+from value_bet_finder import ValueBetFinder
+from scheduler import RefreshScheduler
+from odds_history import OddsHistoryStore
+from pacing import CyclePacer
+from schema import CompactValueBetSchema, SCHEMA_VERSION
+from circuit_breaker import CircuitBreakers
+from devig import DevigEngine
+from publisher import ValueBetPublisher
+from snapshot import SnapshotRecorder
+from logger import WebScraperLogger
+from typing import List
+import constants
+import json
+import os
+import pymongo
+import sys
+import threading
+import time
+
+LOG_PATH = 'logs.log'
+DEFAULT_MAX_POOL_SIZE = 10
+SHUTDOWN_TIMEOUT = 60
+
+def job_competitions(job: dict) -> list:
+    """returns the competitions of a job configuration, resolving the name of a list in constants"""
+    competitions = job["competitions"]
+    if isinstance(competitions, str):
+        competitions = getattr(constants, competitions)
+    return competitions
+
+class FinderRunner:
+    """
+    Description
+    --------------
+    FinderRunner hosts several finder jobs (sport x line/live) in one process, over one shared MongoClient.
+    The client is created on first use with connect=False, so building a runner never touches the network
+
+    Parameters
+    ------------
+    - config: dict
+        The runner configuration:
+        - mongodb_url_env: the environment variable holding the MongoDB url (default MONGODB_URL)
+        - max_pool_size: the maxPoolSize of the shared client (default: the sum of the max_pool_size of the jobs)
+        - jobs: a list of job configurations with the keys
+            - name: the name of the job, also used as the name of its logger
+            - match_db / value_db: the databases of the bookmaker collections and of the value bet collection
+            - pinnacle_collection: the name of the pinnacle collection
+            - bookmaker_collections: the names of the collections compared with pinnacle
+            - value_bet_collection: the name of the value bet collection
+            - arbitrage_collection: optional name of the arbitrage collection
+            - competitions: a list of competitions or the name of a list in constants
+            - line, date_range, thread_pool_workers: as for ValueBetFinder
+            - max_pool_size: the number of connections the job may use, thread_pool_workers is capped to it
+            - read_preference: the read preference of the job's collections (e.g. "secondaryPreferred")
+            - scheduler: optional RefreshScheduler keyword arguments
+            - odds_history_path: optional directory of the job's OddsHistoryStore
+            - pacing: optional CyclePacer keyword arguments
+            - task_deadline: optional time in seconds a (date, competition) task may run
+            - circuit_breaker: optional CircuitBreakers keyword arguments (failure_threshold, reset_timeout)
+            - devig: optional DevigEngine keyword arguments (methods by market type, default_method, cache_size)
+            - schema_version: 2 to write compact value bets (with their indexes and a <value_bet_collection>_legacy view), 1 by default
+            - publisher_socket: optional path of the Unix socket the job's ValueBetPublisher pushes value bet events on
+            - snapshot_path: optional directory where a SnapshotRecorder captures the documents every cycle reads
+    - logger: WebScraperLogger
+        The logger of the runner
+
+    Methods
+    -------------
+    - client -> pymongo.MongoClient
+        The shared client, created on first use
+    - finder(job) -> ValueBetFinder
+        Builds the ValueBetFinder of a job configuration
+    - run()
+        Runs every job in its own thread, paced by a CyclePacer, until interrupted, then closes the publishers and snapshot recorders
+    - stats() -> dict
+        The pacing stats of every job
+    """
+
+    def __init__(self, config: dict, logger: WebScraperLogger):
+
+        self.config = config
+        self.logger = logger
+        self.jobs: List[dict] = config["jobs"]
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.pacers = {}
+
+    @property
+    def client(self) -> pymongo.MongoClient:
+        with self._client_lock:
+            if self._client is None:
+                url_env = self.config.get("mongodb_url_env", "MONGODB_URL")
+                url = os.environ.get(url_env)
+                if not url:
+                    raise RuntimeError(f"The MongoDB url should be set in the {url_env} environment variable")
+                max_pool_size = self.config.get("max_pool_size") or sum(job.get("max_pool_size", DEFAULT_MAX_POOL_SIZE) for job in self.jobs)
+                self._client = pymongo.MongoClient(url, connect=False, maxPoolSize=max_pool_size)
+            return self._client
+
+    def finder(self, job: dict) -> ValueBetFinder:
+        read_preference = make_read_preference(read_pref_mode_from_name(job.get("read_preference", "primary")), None)
+        match_db = self.client.get_database(job.get("match_db", "BookieMarkets"), read_preference=read_preference)
+        value_db = self.client[job.get("value_db", "ValueBets")]
+
+        value_bet_collection = value_db[job["value_bet_collection"]]
+        output_schema = None
+        if job.get("schema_version", 1) == SCHEMA_VERSION:
+            output_schema = CompactValueBetSchema(value_db)
+            output_schema.ensure_indexes(value_bet_collection)
+            output_schema.create_legacy_view(value_bet_collection, job.get("legacy_view", f"{value_bet_collection.name}_legacy"))
+
+        logger = WebScraperLogger(name=job["name"], log_file_path=LOG_PATH)
+        snapshot_recorder = SnapshotRecorder(job["snapshot_path"]) if "snapshot_path" in job else None
+        wrap = snapshot_recorder.wrap if snapshot_recorder else (lambda collection: collection)
+        pinnacle_collection = wrap(match_db[job["pinnacle_collection"]])
+        paired_collections = [(pinnacle_collection, wrap(match_db[name])) for name in job["bookmaker_collections"]]
+
+        max_pool_size = job.get("max_pool_size", DEFAULT_MAX_POOL_SIZE)
+        thread_pool_workers = min(job.get("thread_pool_workers", max_pool_size), max_pool_size)
+
+        return ValueBetFinder(
+                        paired_collections=paired_collections,
+                        value_bet_collection=value_bet_collection,
+                        logger=logger,
+                        line=job.get("line", 0),
+                        competitions=job_competitions(job),
+                        thread_pool_workers=thread_pool_workers,
+                        date_range=job.get("date_range", 3),
+                        scheduler=RefreshScheduler(**job["scheduler"]) if "scheduler" in job else None,
+                        snapshot_recorder=snapshot_recorder,
+                        publisher=ValueBetPublisher(job["publisher_socket"], logger) if "publisher_socket" in job else None,
+                        arbitrage_collection=value_db[job["arbitrage_collection"]] if "arbitrage_collection" in job else None,
+                        odds_history=OddsHistoryStore(job["odds_history_path"]) if "odds_history_path" in job else None,
+                        output_schema=output_schema,
+                        task_deadline=job.get("task_deadline"),
+                        circuit_breakers=CircuitBreakers(**job["circuit_breaker"]) if "circuit_breaker" in job else None,
+                        devig_engine=DevigEngine(**job["devig"]) if "devig" in job else None
+                        )
+
+    def run_job(self, job: dict):
+        pacer = self.pacers[job["name"]] = CyclePacer(self.logger, **job.get("pacing", {}))
+        finder = None
+        while finder is None and not self._stop.is_set():
+            try:
+                finder = self.finder(job)
+            except Exception as e:
+                self.logger.error(f"An exception of type {type(e).__name__} occurred while building {job['name']}: {str(e)}")
+                self._stop.wait(pacer.max_backoff)
+        if finder is None:
+            return
+        
+        def cycle():
+            start = time.monotonic()
+            value_bets_found = finder.find_value_bets_and_update_db()
+            if finder.last_error:
+                raise finder.last_error
+            self.logger.info(f"{value_bets_found} value bets were found by {job['name']} and added to db in {time.monotonic() - start:.1f}s ({pacer.stats['skipped_cycles']} cycles skipped, {pacer.stats['idle_time']:.0f}s idle so far)")
+        
+        collections = [collection for collection_pair in finder.paired_collections for collection in collection_pair]
+        try:
+            if finder.publisher:
+                finder.publisher.start()
+            pacer.run(cycle, collections, self._stop)
+        except Exception as e:
+            self.logger.error(f"An exception of type {type(e).__name__} occurred while running {job['name']}: {str(e)}")
+        finally:
+            self.close_finder(finder)
+
+    def close_finder(self, finder: ValueBetFinder):
+        if finder.publisher:
+            finder.publisher.close()
+        if finder.snapshot_recorder:
+            finder.snapshot_recorder.close()
+        if finder.odds_history:
+            finder.odds_history.close()
+
+    def stats(self) -> dict:
+        return {name: dict(pacer.stats) for name, pacer in self.pacers.items()}
+
+    def run(self):
+        threads = [threading.Thread(target=self.run_job, args=(job,), name=job["name"], daemon=True) for job in self.jobs]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self._stop.set()
+            #let the jobs finish their cycle and close their publisher and snapshot recorder
+            deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+            for thread in threads:
+                thread.join(timeout=max(deadline - time.monotonic(), 0))
+        finally:
+            if self._client is not None:
+                self._client.close()
+
+def main(config_path: str = None):
+    if config_path:
+        with open(config_path) as f:
+            config = json.load(f)
+    else:
+        from football_line_value_bet_finder import FOOTBALL_LINE_JOB
+        from football_live_value_bet_finder import FOOTBALL_LIVE_JOB
+        config = {"jobs": [FOOTBALL_LINE_JOB, FOOTBALL_LIVE_JOB]}
+
+    FinderRunner(config, WebScraperLogger(name=__name__, log_file_path=LOG_PATH)).run()
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
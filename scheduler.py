@@ -0,0 +1,163 @@
+from datetime import datetime, timedelta
+from typing import Callable, Hashable, List, Tuple
+import threading
+import time
+
+# (hours to kickoff, refresh interval in seconds), ordered from the nearest tier to the farthest
+DEFAULT_REFRESH_TIERS = [
+    (6, 5),
+    (24, 30),
+    (48, 120),
+    (float("inf"), 300),
+]
+
+class RefreshScheduler:
+    """
+    Description
+    --------------
+    RefreshScheduler decides which fixtures are due for re-evaluation. Fixtures are assigned to refresh tiers
+    by their time to kickoff, volatile fixtures are promoted to a nearer tier, and when a cycle takes longer
+    than the cycle time budget the farthest tiers are degraded first (their refresh interval is stretched)
+
+    Parameters
+    ------------
+    - tiers: List[Tuple[float, float]]
+        (hours to kickoff, refresh interval in seconds) pairs, ordered from the nearest tier to the farthest
+    - cycle_time_budget: float
+        The time in seconds a full cycle is allowed to take before far tiers are degraded
+    - volatility_window: float
+        The window in seconds in which odds changes are counted to measure the volatility of a fixture
+    - volatility_threshold: int
+        The number of odds changes within the volatility_window that promotes a fixture by one tier
+    - degrade_factor: float
+        The factor by which the refresh interval of a degraded tier is stretched
+    - clock: Callable[[], datetime]
+        Returns the current UTC time, the kickoffs and the refresh intervals are measured against it
+
+    Methods
+    -------------
+    - is_due(key, kickoff, fingerprint=None) -> bool
+        Returns True if the fixture identified by key has to be re-evaluated in this cycle
+    - is_date_due(key, date) -> bool
+        Returns True if at least one tier a fixture on date could belong to has to be re-evaluated in this cycle
+    - begin_cycle() / end_cycle()
+        Measure the cycle time and adapt the number of degraded tiers to the cycle_time_budget
+    """
+
+    def __init__(
+                 self,
+                 tiers: List[Tuple[float, float]] = DEFAULT_REFRESH_TIERS,
+                 cycle_time_budget: float = 60,
+                 volatility_window: float = 300,
+                 volatility_threshold: int = 3,
+                 degrade_factor: float = 4,
+                 clock: Callable[[], datetime] = datetime.utcnow
+                 ):
+
+                self.tiers = sorted(tiers)
+                self.cycle_time_budget = cycle_time_budget
+                self.volatility_window = volatility_window
+                self.volatility_threshold = volatility_threshold
+                self.degrade_factor = degrade_factor
+                self.clock = clock
+                self.degraded_tiers = 0
+                self.last_cycle_duration = 0
+                self._cycle_start = None
+                self._last_checked = {}
+                self._fingerprints = {}
+                self._changes = {}
+                self._lock = threading.Lock()
+
+    def tier_of(self, kickoff: datetime, now: datetime = None) -> int:
+        """returns the index of the tier a fixture kicking off at kickoff belongs to"""
+        now = now or self.clock()
+        hours_to_kickoff = (kickoff - now).total_seconds() / 3600
+        for index, (max_hours, _) in enumerate(self.tiers):
+            if hours_to_kickoff <= max_hours:
+                return index
+        return len(self.tiers) - 1
+
+    def refresh_interval(self, tier: int) -> float:
+        """returns the refresh interval of a tier, stretched if the tier is currently degraded"""
+        interval = self.tiers[tier][1]
+        if tier >= len(self.tiers) - self.degraded_tiers:
+            interval *= self.degrade_factor
+        return interval
+
+    def is_due(self, key: Hashable, kickoff: datetime, fingerprint: Hashable = None) -> bool:
+        """
+        Description
+        -------------
+        Returns True if the fixture identified by key has to be re-evaluated, and marks it as checked
+
+        Parameters
+        -----------
+        - key: Hashable
+            A key identifying the fixture
+        - kickoff: datetime
+            The kickoff of the fixture
+        - fingerprint: Hashable
+            A fingerprint of the current odds of the fixture, used to measure its volatility
+        """
+        now = self.clock()
+        tier = self.tier_of(kickoff, now)
+
+        with self._lock:
+            if fingerprint is not None:
+                changes = [t for t in self._changes.get(key, []) if (now - t).total_seconds() <= self.volatility_window]
+                if key in self._fingerprints and self._fingerprints[key] != fingerprint:
+                    changes.append(now)
+                self._fingerprints[key] = fingerprint
+                self._changes[key] = changes
+                if len(changes) >= self.volatility_threshold:
+                    tier = max(tier - 1, 0)
+
+            last_checked = self._last_checked.get(key)
+            if last_checked is not None and (now - last_checked).total_seconds() < self.refresh_interval(tier):
+                return False
+            self._last_checked[key] = now
+            return True
+
+    def is_date_due(self, key: Hashable, date: datetime) -> bool:
+        """
+        Returns True if the fixtures of date (starting with the nearest one possible) have to be fetched again,
+        and marks the date as checked
+        """
+        return self.is_due(key, max(date, self.clock()))
+
+    def forget(self, key: Hashable):
+        """removes a fixture from the scheduler so that it is due in the next cycle"""
+        with self._lock:
+            self._last_checked.pop(key, None)
+            self._fingerprints.pop(key, None)
+            self._changes.pop(key, None)
+
+    def begin_cycle(self):
+        self._cycle_start = time.monotonic()
+
+    def end_cycle(self) -> float:
+        """
+        Ends the cycle and adapts the number of degraded tiers: one more far tier is degraded while the cycle
+        exceeds the cycle_time_budget and one is restored while it takes less than half of it
+        """
+        if self._cycle_start is None:
+            return 0
+        self.last_cycle_duration = time.monotonic() - self._cycle_start
+        self._cycle_start = None
+
+        if self.last_cycle_duration > self.cycle_time_budget:
+            self.degraded_tiers = min(self.degraded_tiers + 1, len(self.tiers) - 1)
+        elif self.last_cycle_duration < self.cycle_time_budget / 2:
+            self.degraded_tiers = max(self.degraded_tiers - 1, 0)
+
+        self._prune(timedelta(days=1).total_seconds())
+        return self.last_cycle_duration
+
+    def _prune(self, max_age: float):
+        """drops fixtures which haven't been checked for max_age seconds"""
+        now = self.clock()
+        with self._lock:
+            for key in [k for k, t in self._last_checked.items() if (now - t).total_seconds() > max_age]:
+                self._last_checked.pop(key, None)
+                self._fingerprints.pop(key, None)
+                self._changes.pop(key, None)
@@ -0,0 +1,197 @@
+from datetime import datetime
+from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.errors import CollectionInvalid, DuplicateKeyError, OperationFailure
+from helper_functions import match_kickoff
+from typing import List
+import pymongo
+import threading
+
+SCHEMA_VERSION = 2
+
+class IdTable:
+    """
+    Description
+    --------------
+    IdTable assigns small integer ids to names (bookmakers, outcome labels) and persists them in a collection
+    of {_id: int, name: str} documents, so that the ids are stable across processes and restarts
+
+    Parameters
+    ------------
+    - collection: Collection
+        The collection where the ids are stored
+    """
+
+    SEQUENCE_ID = '__sequence__'
+
+    def __init__(self, collection: Collection):
+
+        self.collection = collection
+        self._ids = {}
+        self._lock = threading.Lock()
+        self._indexed = False
+
+    def id(self, name: str) -> int:
+        name_id = self._ids.get(name)
+        if name_id is not None:
+            return name_id
+
+        with self._lock:
+            if not self._indexed:
+                self.collection.create_index("name", unique=True, sparse=True)
+                self._indexed = True
+
+            document = self.collection.find_one({"name": name})
+            if document is None:
+                sequence = self.collection.find_one_and_update({"_id": self.SEQUENCE_ID}, {"$inc": {"value": 1}}, upsert=True, return_document=pymongo.ReturnDocument.AFTER)
+                try:
+                    self.collection.insert_one({"_id": sequence["value"], "name": name})
+                    document = {"_id": sequence["value"]}
+                except DuplicateKeyError:
+                    document = self.collection.find_one({"name": name})
+
+            self._ids[name] = document["_id"]
+            return document["_id"]
+
+class CompactValueBetSchema:
+    """
+    Description
+    --------------
+    CompactValueBetSchema converts the final match of compare_markets to the compact, typed value bet document
+    (version 2) and manages the indexes of the value bet collection and a compatibility view of the old shape.
+
+    A compact document has the fields
+    - _id, v (the schema version), sport, country, competition, home, away, is_live
+    - kickoff: the kickoff of the pinnacle match as a datetime
+    - book2: the home, away, competition and kickoff of the other bookmaker's match, as that bookmaker names them
+    - books: the ids of the pinnacle and the other bookmaker (see the bookmakers collection)
+    - match_ids: the _id of the pinnacle and the other bookmaker's match
+    - bets: a list of {market: dotted market path, condition or label: int, odds: [fair pinnacle odds, bookmaker odds], roi: float (%)},
+      a bet has a condition (the position of the outcome in its market) unless its outcome is labelled, as in a Correct Score
+      or HT-FT market sent as labels and odds, in which case it has a label (the id of the outcome label, see the
+      outcome_labels collection) instead
+    - best_roi: the highest roi of the bets
+    - created_at: the time the value bet was found as a datetime
+    - odds_age: the age in seconds of the oldest odds of the pair
+
+    Parameters
+    ------------
+    - database: Database
+        The database of the value bet collection, where the bookmakers and outcome_labels collections are kept
+
+    Methods
+    -------------
+    - to_document(final_match, match1, match2, created_at) -> dict
+        Returns the compact document of a final match
+    - ensure_indexes(collection)
+        Creates the indexes of the common consumer queries (top roi, by kickoff, by book)
+    - create_legacy_view(collection, view_name)
+        Creates or updates a view presenting the compact documents of collection in the old shape
+    """
+
+    def __init__(self, database: Database):
+
+        self.database = database
+        self.bookmakers = IdTable(database["bookmakers"])
+        self.outcome_labels = IdTable(database["outcome_labels"])
+
+    def to_document(self, final_match: dict, match1: dict, match2: dict, created_at: datetime) -> dict:
+        bookmaker1 = match1["bookmaker_name"]
+        bookmaker2 = match2["bookmaker_name"]
+        bets = self._bets(final_match.get("scoreboards", {}), "scoreboards", bookmaker1, bookmaker2)
+
+        document = {
+            "_id": final_match["_id"],
+            "v": SCHEMA_VERSION,
+            "sport": match1["sport_name"],
+            "country": match1["country"],
+            "competition": match1["competition"],
+            "home": match1["teams"][0],
+            "away": match1["teams"][1],
+            "kickoff": match_kickoff(match1),
+            "book2": {"home": match2["teams"][0], "away": match2["teams"][1], "competition": match2["competition"], "kickoff": match_kickoff(match2)},
+            "is_live": bool(match1["is_live"]),
+            "books": [self.bookmakers.id(bookmaker1), self.bookmakers.id(bookmaker2)],
+            "match_ids": [match1["_id"], match2["_id"]],
+            "bets": bets,
+            "best_roi": max((bet["roi"] for bet in bets), default=None),
+            "created_at": created_at,
+        }
+        if "value_bet_age" in final_match:
+            hours, minutes, seconds = (int(part) for part in final_match["value_bet_age"].split(':'))
+            document["odds_age"] = hours*3600 + minutes*60 + seconds
+        return document
+
+    def _bets(self, markets: dict, path: str, bookmaker1: str, bookmaker2: str) -> List[dict]:
+        bets = []
+        for k, v in markets.items():
+            market_path = f"{path}.{k}"
+            if isinstance(v, dict):
+                bets.extend(self._bets(v, market_path, bookmaker1, bookmaker2))
+            elif isinstance(v, list):
+                for value_bet in v:
+                    if not isinstance(value_bet, dict) or "Condition" not in value_bet:
+                        continue
+                    bet = {"market": market_path}
+                    if value_bet.get("Labelled"):
+                        bet["label"] = self.outcome_labels.id(value_bet["Condition"])
+                    else:
+                        bet["condition"] = int(value_bet["Condition"])
+                    bet["odds"] = [value_bet[bookmaker1], value_bet[bookmaker2]]
+                    bet["roi"] = (bet["odds"][1]/bet["odds"][0] - 1)*100
+                    bets.append(bet)
+        return bets
+
+    def ensure_indexes(self, collection: Collection):
+        collection.create_indexes([
+            pymongo.IndexModel([("best_roi", pymongo.DESCENDING)], name="top_roi"),
+            pymongo.IndexModel([("kickoff", pymongo.ASCENDING), ("best_roi", pymongo.DESCENDING)], name="by_kickoff"),
+            pymongo.IndexModel([("books", pymongo.ASCENDING), ("best_roi", pymongo.DESCENDING)], name="by_book"),
+        ])
+
+    def create_legacy_view(self, collection: Collection, view_name: str):
+        """
+        Creates or updates a view of collection in the old shape: the top level fields are strings as before and the
+        value bets are listed in value_bets as {market, Condition, <bookmaker>: odds, ROI: "x%"}, since the nested
+        market dictionaries of the old shape can't be rebuilt by a view. The Condition of a labelled outcome is its label
+        """
+        book_name = lambda index: {"$arrayElemAt": [
+            {"$map": {"input": {"$filter": {"input": "$book_docs", "as": "book", "cond": {"$eq": ["$$book._id", {"$arrayElemAt": ["$books", index]}]}}}, "as": "book", "in": "$$book.name"}}, 0]}
+        teams = lambda home, away: {"$concat": ["['", home, "', '", away, "']"]}
+        short_date = lambda field: {"$concat": [
+            {"$dateToString": {"date": field, "format": "%d/%m/"}},
+            {"$substrCP": [{"$dateToString": {"date": field, "format": "%Y"}}, 2, 2]}]}
+        label_name = {"$arrayElemAt": [
+            {"$map": {"input": {"$filter": {"input": "$label_docs", "as": "label", "cond": {"$eq": ["$$label._id", "$$bet.label"]}}}, "as": "label", "in": "$$label.name"}}, 0]}
+        time = lambda field: {"$dateToString": {"date": field, "format": "%H:%M"}}
+
+        pipeline = [
+            {"$lookup": {"from": self.bookmakers.collection.name, "localField": "books", "foreignField": "_id", "as": "book_docs"}},
+            {"$lookup": {"from": self.outcome_labels.collection.name, "localField": "bets.label", "foreignField": "_id", "as": "label_docs"}},
+            {"$addFields": {"bookmaker1": book_name(0), "bookmaker2": book_name(1)}},
+            {"$project": {
+                "bookmaker_name": {"$concat": ["$bookmaker1", " - ", "$bookmaker2"]},
+                "match_id": {"$concat": [{"$arrayElemAt": ["$match_ids", 0]}, " - ", {"$arrayElemAt": ["$match_ids", 1]}]},
+                "teams": {"$concat": [teams("$home", "$away"), " - ", teams("$book2.home", "$book2.away")]},
+                "sport_name": "$sport",
+                "country": "$country",
+                "competition": {"$concat": ["$competition", " - ", "$book2.competition"]},
+                "date": {"$concat": [short_date("$kickoff"), " | ", short_date("$book2.kickoff")]},
+                "time": {"$concat": [time("$kickoff"), " | ", time("$book2.kickoff")]},
+                "is_live": "$is_live",
+                "created_date": short_date("$created_at"),
+                "created_time": {"$dateToString": {"date": "$created_at", "format": "%H:%M:%S"}},
+                "value_bets": {"$map": {"input": "$bets", "as": "bet", "in": {"$arrayToObject": [[
+                    {"k": "market", "v": "$$bet.market"},
+                    {"k": "Condition", "v": {"$ifNull": [{"$toString": "$$bet.condition"}, label_name]}},
+                    {"k": "$bookmaker1", "v": {"$arrayElemAt": ["$$bet.odds", 0]}},
+                    {"k": "$bookmaker2", "v": {"$arrayElemAt": ["$$bet.odds", 1]}},
+                    {"k": "ROI", "v": {"$concat": [{"$toString": "$$bet.roi"}, "%"]}},
+                ]]}}},
+            }},
+        ]
+
+        try:
+            self.database.create_collection(view_name, viewOn=collection.name, pipeline=pipeline)
+        except (CollectionInvalid, OperationFailure):
+            self.database.command("collMod", view_name, viewOn=collection.name, pipeline=pipeline)
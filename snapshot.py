@@ -0,0 +1,230 @@
+from datetime import datetime
+from pymongo.collection import Collection
+from typing import Iterator, List
+import bson
+import json
+import mmap
+import os
+import threading
+import time
+
+INDEX_LOG = 'index.log'
+SEGMENT_FILE = 'segment-{:05d}.bson'
+
+def query_key(query: dict) -> str:
+    """returns a canonical string for a find filter, used to look the query up in a snapshot"""
+    return json.dumps(query or {}, sort_keys=True, default=str)
+
+class SnapshotRecorder:
+    """
+    Description
+    --------------
+    SnapshotRecorder captures the exact documents each cycle of a ValueBetFinder reads into a local snapshot.
+    Documents are stored as BSON in append-only segment files and an append-only index log holds one line per cycle,
+    mapping every (collection, query) of the cycle to the location of its documents, along with the production
+    timings needed to compare replays
+
+    Parameters
+    ------------
+    - path: str
+        The directory where the snapshot is written
+    - segment_size: int
+        The size in bytes after which a new segment file is started
+
+    Methods
+    -------------
+    - wrap(collection) -> RecordingCollection
+        Wraps a pymongo collection so that the documents it returns are captured
+    - begin_cycle(started_at) / end_cycle()
+        Delimit the cycles of the snapshot, the line of a cycle is appended to the index log at its end
+    """
+
+    def __init__(self, path: str, segment_size: int = 64*1024*1024):
+
+        self.path = path
+        self.segment_size = segment_size
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._cycle = None
+        self._cycle_start = None
+        self._segment = len([name for name in os.listdir(path) if name.startswith('segment-')])
+        self._file = None
+        self._open_segment()
+
+    def wrap(self, collection: Collection) -> 'RecordingCollection':
+        return RecordingCollection(collection, self)
+
+    def begin_cycle(self, started_at: datetime = None):
+        self._cycle_start = time.monotonic()
+        self._cycle = {"started_at": (started_at or datetime.utcnow()).isoformat(), "duration": None, "queries": {}}
+
+    def end_cycle(self):
+        if self._cycle is None:
+            return
+        with self._lock:
+            self._file.flush()
+            self._cycle["duration"] = time.monotonic() - self._cycle_start
+            with open(os.path.join(self.path, INDEX_LOG), 'a') as f:
+                f.write(json.dumps(self._cycle) + '\n')
+            self._cycle = None
+
+    def record(self, collection_name: str, query: dict, documents: List[dict], latency: float):
+        """appends the documents returned by a query to the current segment and indexes them"""
+        if self._cycle is None:
+            return
+        data = b''.join(bson.encode(document) for document in documents)
+        with self._lock:
+            if self._file.tell() + len(data) > self.segment_size and self._file.tell() > 0:
+                self._file.close()
+                self._segment += 1
+                self._open_segment()
+            offset = self._file.tell()
+            self._file.write(data)
+            queries = self._cycle["queries"].setdefault(collection_name, {})
+            queries[query_key(query)] = [self._segment, offset, len(data), latency]
+
+    def close(self):
+        self.end_cycle()
+        self._file.close()
+
+    def _open_segment(self):
+        self._file = open(os.path.join(self.path, SEGMENT_FILE.format(self._segment)), 'ab')
+
+class RecordingCollection:
+    """A pymongo collection proxy which records the documents returned by find in a SnapshotRecorder"""
+
+    def __init__(self, collection: Collection, recorder: SnapshotRecorder):
+        self.collection = collection
+        self.recorder = recorder
+        self.name = collection.name
+
+    def find(self, query: dict = None, *args, **kwargs) -> List[dict]:
+        start = time.monotonic()
+        documents = list(self.collection.find(query, *args, **kwargs))
+        self.recorder.record(self.name, query, documents, time.monotonic() - start)
+        return documents
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+class SnapshotReplay:
+    """
+    Description
+    --------------
+    SnapshotReplay replays a snapshot written by a SnapshotRecorder. Its collections can be passed to a
+    ValueBetFinder instead of pymongo collections and its clock makes the finder see the time of the recorded cycle.
+    Segments are memory-mapped, so only the documents a query returns are decoded, and the index log is read one
+    cycle at a time
+
+    Parameters
+    ------------
+    - path: str
+        The directory of the snapshot
+    - simulate_latency: bool
+        If True, each query sleeps for the latency recorded in production so that replay timings are comparable to production
+
+    Methods
+    -------------
+    - collection(name) -> ReplayCollection
+        Returns a collection serving the recorded documents of name
+    - cycles() -> Iterator[dict]
+        Steps through the recorded cycles, yielding the index entry of each one (including its production duration)
+    - clock() -> datetime
+        Returns the start time of the recorded cycle, frozen for the whole cycle so that replays are deterministic
+    - collection_names() -> List[str]
+        Returns the names of the collections recorded in the first cycle
+    """
+
+    def __init__(self, path: str, simulate_latency: bool = True):
+
+        self.path = path
+        self.simulate_latency = simulate_latency
+        self._index_path = os.path.join(path, INDEX_LOG)
+        if not os.path.exists(self._index_path):
+            raise FileNotFoundError(f"No snapshot index log at {self._index_path}")
+        self._segments = {}
+        self._cycle = None
+        self._started_at = None
+
+    def __len__(self):
+        with open(self._index_path, 'rb') as f:
+            return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1024*1024), b''))
+
+    def collection(self, name: str) -> 'ReplayCollection':
+        return ReplayCollection(name, self)
+
+    def cycles(self) -> Iterator[dict]:
+        for cycle in self._index_cycles():
+            self._cycle = cycle
+            self._started_at = datetime.fromisoformat(cycle["started_at"])
+            yield cycle
+        self._cycle = None
+
+    def clock(self) -> datetime:
+        if self._cycle is None:
+            return datetime.utcnow()
+        return self._started_at
+
+    def collection_names(self) -> List[str]:
+        first_cycle = next(self._index_cycles(), {"queries": {}})
+        return sorted(first_cycle["queries"])
+
+    def _index_cycles(self) -> Iterator[dict]:
+        with open(self._index_path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # the line of a cycle which is still being appended
+                    return
+
+    def find(self, collection_name: str, query: dict) -> List[dict]:
+        if self._cycle is None:
+            raise RuntimeError('SnapshotReplay.find called outside of a cycle, iterate over cycles() first')
+        location = self._cycle["queries"].get(collection_name, {}).get(query_key(query))
+        if location is None:
+            return []
+        segment, offset, length, latency = location
+        if self.simulate_latency:
+            time.sleep(latency)
+        if length == 0:
+            return []
+        return bson.decode_all(self._segment(segment)[offset:offset + length])
+
+    def close(self):
+        for f, segment in self._segments.values():
+            segment.close()
+            f.close()
+        self._segments = {}
+
+    def _segment(self, segment: int) -> mmap.mmap:
+        if segment not in self._segments:
+            f = open(os.path.join(self.path, SEGMENT_FILE.format(segment)), 'rb')
+            self._segments[segment] = (f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return self._segments[segment][1]
+
+class ReplayCollection:
+    """A read-only stand-in for a pymongo collection serving the documents of a SnapshotReplay"""
+
+    def __init__(self, name: str, replay: SnapshotReplay):
+        self.name = name
+        self.replay = replay
+
+    def find(self, query: dict = None, *args, **kwargs) -> List[dict]:
+        return self.replay.find(self.name, query)
+
+class SinkCollection:
+    """A stand-in for the value_bet_collection which keeps the value bets of a replay in memory"""
+
+    def __init__(self, name: str = 'value_bet_sink'):
+        self.name = name
+        self.documents = {}
+
+    def replace_one(self, query: dict, document: dict, upsert: bool = False) -> bool:
+        self.documents[document['_id']] = document
+        return True
+
+    def delete_many(self, query: dict):
+        keep = set(query.get('_id', {}).get('$nin', self.documents.keys()))
+        self.documents = {k: v for k, v in self.documents.items() if k in keep}
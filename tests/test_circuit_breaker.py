@@ -0,0 +1,64 @@
+from circuit_breaker import CircuitBreaker, CircuitBreakers
+import pytest
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr("circuit_breaker.time.monotonic", clock)
+    return clock
+
+def test_trips_after_failure_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.allow()
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    assert not breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_trial_success_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.now += 59
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # only a single trial is allowed until the next reset_timeout
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+def test_half_open_trial_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow()
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    clock.now += 60
+    assert breaker.allow()
+
+def test_breakers_are_kept_per_collection(clock):
+    breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+    assert breakers.record_failure("bet365")
+    assert not breakers.allow("bet365")
+    assert breakers.allow("pinnacle")
+    assert breakers.tripped() == ["bet365"]
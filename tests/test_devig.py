@@ -0,0 +1,40 @@
+from devig import DEVIG_METHODS, additive, power, shin
+import pytest
+
+MARKETS = [
+    [1.91, 1.91],
+    [1.5, 2.7],
+    [2.1, 3.4, 3.6],
+    [1.25, 6.0, 11.0],
+    [7.0, 6.5, 9.0, 12.0, 15.0, 21.0, 26.0, 41.0],
+]
+
+@pytest.mark.parametrize("method", sorted(DEVIG_METHODS))
+def test_fair_probabilities_sum_to_one(method):
+    for fair_odds in DEVIG_METHODS[method](MARKETS):
+        assert sum(1/odd for odd in fair_odds) == pytest.approx(1, abs=1e-9)
+
+def test_shin_matches_additive_for_two_way_markets():
+    two_way_markets = [market for market in MARKETS if len(market) == 2]
+    for shin_odds, additive_odds in zip(shin(two_way_markets), additive(two_way_markets)):
+        assert shin_odds == pytest.approx(additive_odds, rel=1e-6)
+
+def test_power_converges():
+    # one iteration short of convergence the probabilities don't sum to 1 yet, the default iterations get there
+    assert abs(sum(1/odd for odd in power([MARKETS[2]], iterations=1)[0]) - 1) > 1e-9
+    for fair_odds in power(MARKETS):
+        assert sum(1/odd for odd in fair_odds) == pytest.approx(1, abs=1e-12)
+
+def test_shin_converges():
+    fair_odds = shin(MARKETS)
+    for converged_odds, odds in zip(shin(MARKETS, iterations=200), fair_odds):
+        assert converged_odds == pytest.approx(odds, rel=1e-12)
+    # Shin removes more of the overround from the longshots than the favourite
+    favourite, *_, longshot = MARKETS[3]
+    fair_favourite, *_, fair_longshot = fair_odds[3]
+    assert fair_longshot/longshot > fair_favourite/favourite
+
+def test_no_overround_is_left_unchanged():
+    fair_market = [2.0, 2.0]
+    for method in DEVIG_METHODS.values():
+        assert method([fair_market])[0] == pytest.approx(fair_market)
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+from odds_history import OddsHistoryStore
+import pytest
+
+START = datetime(2026, 10, 3, 12, 0)
+
+def make_match(bookmaker: str, kickoff: datetime, odds: list) -> dict:
+    return {
+        "_id": f"{bookmaker}-{kickoff:%H%M}",
+        "bookmaker_name": bookmaker,
+        "date": kickoff.strftime("%d/%m/%y"),
+        "time": kickoff.strftime("%H:%M"),
+        "scoreboards": {"full_time": {"1X2": odds}},
+    }
+
+@pytest.fixture
+def store(tmp_path):
+    store = OddsHistoryStore(str(tmp_path), evict_after=3600)
+    yield store
+    store.close()
+
+def test_history_records_only_changed_odds(store):
+    match = make_match("pinnacle", START + timedelta(hours=2), [2.0, 3.5, 3.8])
+    store.append("fixture", match, START)
+    store.flush()
+    store.append("fixture", match, START + timedelta(minutes=1))
+    match["scoreboards"]["full_time"]["1X2"] = [2.1, 3.5, 3.8]
+    store.append("fixture", match, START + timedelta(minutes=2))
+    store.flush()
+
+    history = store.history("fixture")
+    assert history["pinnacle|scoreboards.full_time.1X2#0"] == [(START, 2.0), (START + timedelta(minutes=2), pytest.approx(2.1))]
+    assert history["pinnacle|scoreboards.full_time.1X2#2"] == [(START, pytest.approx(3.8))]
+    assert store.history("unknown fixture") == {}
+
+def test_history_after_eviction_and_reopen(store, tmp_path):
+    early = make_match("pinnacle", START, [1.9, 3.6, 4.0])
+    late = make_match("bet365", START + timedelta(hours=5), [2.5, 3.1, 2.9])
+    store.append("early", early, START - timedelta(hours=1))
+    store.append("late", late, START - timedelta(hours=1))
+    store.flush()
+    early_history = store.history("early")
+
+    # a flush more than evict_after past the kickoff of early evicts it from memory, its history stays readable
+    late["scoreboards"]["full_time"]["1X2"] = [2.4, 3.1, 2.9]
+    store.append("late", late, START + timedelta(hours=2))
+    store.flush()
+    assert "early" not in store._kickoffs
+    assert "late" in store._kickoffs
+    assert store.history("early") == early_history
+    assert len(store.history("late")["bet365|scoreboards.full_time.1X2#0"]) == 2
+
+    reopened = OddsHistoryStore(str(tmp_path), evict_after=3600)
+    try:
+        assert "early" not in reopened._kickoffs
+        assert reopened.history("early") == early_history
+        assert reopened.history("late") == store.history("late")
+    finally:
+        reopened.close()
@@ -1,11 +1,23 @@
 import datetime
 from datetime import datetime, timedelta, time
 from pymongo.collection import Collection
-from typing import Tuple, List
+from typing import Callable, Tuple, List
 from helper_functions import *
 from concurrent.futures import ThreadPoolExecutor, wait
 from logger import WebScraperLogger
+from scheduler import RefreshScheduler
+from snapshot import SnapshotRecorder
+from publisher import ValueBetPublisher
+from arbitrage import BestPriceBoard
+from odds_history import OddsHistoryStore
+from schema import CompactValueBetSchema
+from circuit_breaker import CircuitBreakers, TaskDeadlineExceeded
+from devig import DevigEngine
+from pymongo.errors import AutoReconnect, ExecutionTimeout, NetworkTimeout
+from time import monotonic
+import hashlib
 import math
+import threading
 from more_itertools import chunked
 import asyncio
 
@@ -25,6 +37,27 @@ class ValueBetFinder:
         The logger to log any information while finding value_bets
     - thread_pool_workers: int
         The number of threads the ValueBetFinder should use (more threads increases the scan speed)
+    - scheduler: RefreshScheduler
+        Optional scheduler deciding which dates and fixtures are re-evaluated in a cycle, by default every fixture is re-evaluated in every cycle.
+        The scheduler follows the clock of the finder
+    - snapshot_recorder: SnapshotRecorder
+        Optional recorder delimiting the cycles of a snapshot, the paired_collections should be wrapped by the same recorder
+    - clock: Callable[[], datetime]
+        Returns the current UTC time, a SnapshotReplay clock can be passed to replay recorded cycles
+    - publisher: ValueBetPublisher
+        Optional publisher pushing value bet create/update/expire events to consumers as soon as they are found
+    - arbitrage_collection: Collection
+        Optional collection where the arbitrages found across all the bookmakers of a fixture are stored
+    - odds_history: OddsHistoryStore
+        Optional store where the odds movements of the matched pairs are appended every cycle
+    - output_schema: CompactValueBetSchema
+        Optional compact schema the value bets are written in, by default they are written in the shape compare_markets returns
+    - task_deadline: float
+        Optional time in seconds a (date, competition) task may run, its reads get the remaining time as max_time_ms and it is cancelled once the deadline passes
+    - circuit_breakers: CircuitBreakers
+        Optional circuit breakers which skip the tasks of a collection whose reads keep timing out
+    - devig_engine: DevigEngine
+        Optional engine computing the fair pinnacle odds per market type and caching them per pinnacle odds version, by default no_vig_odds is used
         
     Methods
     -------------
@@ -42,7 +75,17 @@ class ValueBetFinder:
                  line: int,
                  competitions: list,
                  thread_pool_workers = 0,
-                 date_range = 3
+                 date_range = 3,
+                 scheduler: RefreshScheduler = None,
+                 snapshot_recorder: SnapshotRecorder = None,
+                 clock: Callable[[], datetime] = datetime.utcnow,
+                 publisher: ValueBetPublisher = None,
+                 arbitrage_collection: Collection = None,
+                 odds_history: OddsHistoryStore = None,
+                 output_schema: CompactValueBetSchema = None,
+                 task_deadline: float = None,
+                 circuit_breakers: CircuitBreakers = None,
+                 devig_engine: DevigEngine = None
                  ):
         
                 self.paired_collections = paired_collections
@@ -52,6 +95,26 @@ class ValueBetFinder:
                 self.line = line
                 self.competitions = competitions
                 self.date_range = date_range
+                self.scheduler = scheduler
+                if scheduler:
+                    scheduler.clock = clock
+                self.snapshot_recorder = snapshot_recorder
+                self.clock = clock
+                self.publisher = publisher
+                self.arbitrage_collection = arbitrage_collection
+                self.best_price_board = BestPriceBoard() if arbitrage_collection is not None else None
+                self.odds_history = odds_history
+                self.output_schema = output_schema
+                self.task_deadline = task_deadline
+                self.circuit_breakers = circuit_breakers
+                self.devig_engine = devig_engine
+                self.metrics = {}
+                self._metrics_lock = threading.Lock()
+                self._pinnacle_cache = {}
+                self._pinnacle_cache_lock = threading.Lock()
+                self.value_bet_ids_by_date = {}
+                self.previous_value_bet_ids_by_date = {}
+                self.last_error = None
         
     def find_value_bets_and_update_db(self) -> int:
         
@@ -66,6 +129,16 @@ class ValueBetFinder:
         """
         
         self.logger.info("Starting Value Bet Finder ...")
+        self.ids_of_updated_value_bets = []
+        self.last_error = None
+        self._pinnacle_cache = {}
+        self.metrics = {"timed_out_tasks": 0, "skipped_tasks": 0, "tripped_breakers": []}
+        if self.scheduler:
+            self.scheduler.begin_cycle()
+        if self.best_price_board:
+            self.best_price_board.begin_cycle()
+        if self.snapshot_recorder:
+            self.snapshot_recorder.begin_cycle(self.clock())
         
         try:
             
@@ -82,12 +155,93 @@ class ValueBetFinder:
                     executor.submit(self.split_search_by_collection_pair, collection_pair)
                 
             self.value_bet_collection.delete_many({'_id': {'$nin': self.ids_of_updated_value_bets}})  #delete any value bet that is no longer available from the value_bet_collection
+            if self.publisher:
+                self.publisher.expire(self.ids_of_updated_value_bets)
+            
+            if self.best_price_board:
+                self.update_arbitrage_collection()
+            
+            if self.odds_history:
+                self.odds_history.flush()
                   
         except Exception as e:
+            self.last_error = e
             self.logger.error(f"An exception of type {type(e).__name__} occurred while running find_value_bets_and_update_db: {str(e)}")
         
+        if self.scheduler:
+            cycle_duration = self.scheduler.end_cycle()
+            if self.scheduler.degraded_tiers:
+                self.logger.warning(f"Cycle took {cycle_duration:.1f}s, {self.scheduler.degraded_tiers} far refresh tier(s) degraded")
+        if self.snapshot_recorder:
+            self.snapshot_recorder.end_cycle()
+        if self.circuit_breakers:
+            self.metrics["tripped_breakers"] = self.circuit_breakers.tripped()
+        if self.metrics["timed_out_tasks"] or self.metrics["skipped_tasks"] or self.metrics["tripped_breakers"]:
+            self.logger.warning(f"{self.metrics['timed_out_tasks']} task(s) timed out and {self.metrics['skipped_tasks']} task(s) were skipped, tripped circuit breakers: {self.metrics['tripped_breakers']}")
+        
         return len(self.ids_of_updated_value_bets)
 
+    def update_arbitrage_collection(self) -> int:
+        
+        """ 
+        Scans the best prices of all the matched fixtures for arbitrages, updates the arbitrage_collection and returns the number of arbitrages found
+        """
+        
+        ids_of_arbitrages = []
+        for arbitrage in self.best_price_board.scan():
+            result = self.arbitrage_collection.replace_one({'_id': arbitrage['_id']}, arbitrage, upsert=True)
+            if result:
+                ids_of_arbitrages.append(arbitrage['_id'])
+            else:
+                self.logger.error(f"An arbitrage could not be added to database: {arbitrage}, result: {result}")
+        
+        self.arbitrage_collection.delete_many({'_id': {'$nin': ids_of_arbitrages}})  #delete any arbitrage that is no longer available from the arbitrage_collection
+        return len(ids_of_arbitrages)
+
+    def find_pinnacle_matches(self, pinnacle_collection: Collection, date_string: str, competition: str, deadline: float = None) -> list:
+        
+        """ 
+        Returns the pinnacle matches of a date and competition. The pinnacle collection is shared by all the paired_collections,
+        so its matches are read once per cycle and shared between the pairs
+        """
+        
+        with self._pinnacle_cache_lock:
+            entry = self._pinnacle_cache.setdefault((pinnacle_collection.name, date_string, competition), [threading.Lock(), None])
+        
+        with entry[0]:
+            if entry[1] is None:
+                entry[1] = self.find_with_deadline(pinnacle_collection, {"date": date_string, "country": competition}, deadline)
+        
+        return entry[1]
+
+    def find_with_deadline(self, collection: Collection, query: dict, deadline: float = None) -> list:
+        
+        """ 
+        Returns the documents of collection matching query, the read gets the time left before deadline (a time.monotonic() value) as max_time_ms.
+        Timed out reads and connection failures (AutoReconnect, including NetworkTimeout and ServerSelectionTimeoutError) are recorded by the circuit breaker of the collection
+        """
+        
+        kwargs = {}
+        if deadline is not None:
+            kwargs["max_time_ms"] = int((deadline - monotonic())*1000)
+            if kwargs["max_time_ms"] <= 0:
+                raise TaskDeadlineExceeded(f"No time left to read {collection.name}")
+        
+        try:
+            documents = list(collection.find(query, **kwargs))
+        except (ExecutionTimeout, AutoReconnect):
+            if self.circuit_breakers and self.circuit_breakers.record_failure(collection.name):
+                self.logger.warning(f"The circuit breaker of {collection.name} tripped, its tasks are skipped for {self.circuit_breakers.reset_timeout}s")
+            raise
+        
+        if self.circuit_breakers:
+            self.circuit_breakers.record_success(collection.name)
+        return documents
+
+    def _count_metric(self, name: str):
+        with self._metrics_lock:
+            self.metrics[name] += 1
+
     def split_search_by_collection_pair(self, collection_pair: Tuple[Collection, Collection]):
         
         """ 
@@ -95,17 +249,31 @@ class ValueBetFinder:
         The first collection in the pair is the pinnacle collection
         """
         
-        now = date = datetime.utcnow()
+        now = date = self.clock()
         date_string = now.strftime("%d/%m/%y")
         
         date_range = self.date_range
         if self.line == 1:
             date_range = 1
+        
+        pair_key = (collection_pair[0].name, collection_pair[1].name)
 
         for _ in range(0 ,date_range):
             
             try:
                 
+                #keep the value bets (and the odds on the best price board) of a date which is not due for a refresh in this cycle
+                date_key = (pair_key, date_string)
+                if self.scheduler and not self.scheduler.is_date_due(date_key, datetime.strptime(date_string, "%d/%m/%y")):
+                    self.ids_of_updated_value_bets.extend(self.value_bet_ids_by_date.get(date_key, []))
+                    if self.best_price_board:
+                        self.best_price_board.keep(date_key)
+                    date = date + timedelta(days=1)
+                    date_string = date.strftime("%d/%m/%y")
+                    continue
+                self.previous_value_bet_ids_by_date[date_key] = self.value_bet_ids_by_date.get(date_key, set())
+                self.value_bet_ids_by_date[date_key] = set()
+                
                 #calculating threadpool workers for parrallel execution
                 if self.thread_pool_workers == 0:
                     max_workers = len(self.competitions)
@@ -140,6 +308,9 @@ class ValueBetFinder:
         async def run_find_value(date_string, competition, collection_pair):
             try:
                 await self._find_value_bets_and_update_db(date_string, competition, collection_pair)
+            except (TaskDeadlineExceeded, ExecutionTimeout, NetworkTimeout) as e:
+                self._count_metric("timed_out_tasks")
+                self.logger.warning(f"The task {date_string} {competition} of {collection_pair[1].name} timed out: {str(e)}")
             except Exception as e:
                 self.logger.error(f"An exception of type {type(e).__name__} occurred while running _find_value_bets_and_update_db: {str(e)}")
         
@@ -150,7 +321,8 @@ class ValueBetFinder:
     async def _find_value_bets_and_update_db(self, date_string: str, competition: str, collection_pair: Tuple[Collection, Collection]):
         
         match_pair_list = []
-        now = datetime.utcnow()
+        pair_key = (collection_pair[0].name, collection_pair[1].name)
+        now = self.clock()
         now_plus_two_hours = now + timedelta(hours=2)
         start_time = time(0, 0)  # 00:00
         end_time = time(1, 0)  # 01:00
@@ -159,13 +331,21 @@ class ValueBetFinder:
         else:
             time_ref = (now - timedelta(hours=1)).time()
         
-        collection1_matches = list(collection_pair[0].find({"date": date_string, "country": competition}))
-        collection2_matches = list(collection_pair[1].find({"date": date_string, "country": competition}))
+        #skip the task if the circuit breaker of one of the collections is tripped
+        if self.circuit_breakers and not all(self.circuit_breakers.allow(collection.name) for collection in collection_pair):
+            self._count_metric("skipped_tasks")
+            return
+        
+        deadline = monotonic() + self.task_deadline if self.task_deadline else None
+        collection1_matches = self.find_pinnacle_matches(collection_pair[0], date_string, competition, deadline)
+        collection2_matches = self.find_with_deadline(collection_pair[1], {"date": date_string, "country": competition}, deadline)
         time_format = '%H:%M:%S'
         date_format = "%d/%m/%y"
         
         if len(collection1_matches) <= len(collection2_matches):
             for _match1 in collection1_matches:
+                if deadline is not None and monotonic() > deadline:
+                    raise TaskDeadlineExceeded(f"The deadline passed while matching {len(collection1_matches)} pinnacle matches")
                 if  datetime.strptime(_match1['last_modified_date'], date_format).date() < now.date():
                     pass
                 elif _match1['date'] ==  now.strftime("%d/%m/%y") and now_plus_two_hours.strftime("%H:%M") > _match1['time']:
@@ -180,6 +360,8 @@ class ValueBetFinder:
                                 match_pair_list.append((_match1, _match2))
         else:
             for _match2 in collection2_matches:
+                if deadline is not None and monotonic() > deadline:
+                    raise TaskDeadlineExceeded(f"The deadline passed while matching {len(collection2_matches)} {collection_pair[1].name} matches")
                 if  datetime.strptime(_match2['last_modified_date'], date_format).date() < now.date():
                     pass
                 elif _match2['date'] ==  now.strftime("%d/%m/%y") and now_plus_two_hours.strftime("%H:%M") > _match2['time']:
@@ -195,6 +377,9 @@ class ValueBetFinder:
                 
         for match_pair in match_pair_list:
             
+            if deadline is not None and monotonic() > deadline:
+                raise TaskDeadlineExceeded(f"The deadline passed while comparing {len(match_pair_list)} match pairs")
+            
             try:
                 
                 match1, match2 = match_pair
@@ -203,16 +388,35 @@ class ValueBetFinder:
                     
                     if match1["last_modified_date"] == match2["last_modified_date"]:
                         
-                        match1, match2 = equalize_matches(match1, match2)
-                        match1 = update_match_scoreboard(match1, no_vig_odds)
-                        final_match = remove_false_fields(compare_markets(match1, match2, match1['bookmaker_name'], match2['bookmaker_name']))
+                        if self.best_price_board:
+                            self.best_price_board.add(match1, match2, (pair_key, date_string))
+                        
+                        #skip fixtures which are not due for a refresh, keeping their value bet if one was written in an earlier cycle
+                        if self.scheduler:
+                            value_bet_id = hashlib.md5((match1["_id"] + match1["bookmaker_name"] + match2["bookmaker_name"]).encode()).hexdigest()
+                            fingerprint = (odds_fingerprint(match1), odds_fingerprint(match2))
+                            if not self.scheduler.is_due(value_bet_id, match_kickoff(match1), fingerprint):
+                                if value_bet_id in self.previous_value_bet_ids_by_date.get((pair_key, date_string), ()):
+                                    self.ids_of_updated_value_bets.append(value_bet_id)
+                                    self.value_bet_ids_by_date.setdefault((pair_key, date_string), set()).add(value_bet_id)
+                                continue
+                        
+                        if self.odds_history:
+                            self.odds_history.append(match1["_id"], match1, now)
+                            self.odds_history.append(match1["_id"], match2, now)
+                        
+                        final_match = compare_match_pair(match1, match2, devig_engine=self.devig_engine, clock=self.clock)
                         
                         if 'scoreboards' in final_match:
-                            result = self.value_bet_collection.replace_one({'_id': final_match['_id']}, final_match, upsert=True)
+                            value_bet = self.output_schema.to_document(final_match, match1, match2, now) if self.output_schema else final_match
+                            result = self.value_bet_collection.replace_one({'_id': value_bet['_id']}, value_bet, upsert=True)
                             if result:
-                                self.ids_of_updated_value_bets.append(final_match['_id'])
+                                self.ids_of_updated_value_bets.append(value_bet['_id'])
+                                self.value_bet_ids_by_date.setdefault((pair_key, date_string), set()).add(value_bet['_id'])
+                                if self.publisher:
+                                    self.publisher.publish(value_bet)
                             else:
-                                self.logger.error(f"A Value bet could not be added to database: {final_match}, result: {result}")
+                                self.logger.error(f"A Value bet could not be added to database: {value_bet}, result: {result}")
                 
             except Exception as e:
                 self.logger.error(f"An exception of type {type(e).__name__} occurred while comparing markets in match_pair: {str(e)}")
\ No newline at end of file